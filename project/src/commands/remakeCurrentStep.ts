@@ -1,8 +1,10 @@
 import * as vscode from 'vscode';
+import * as fs from 'fs/promises';
+import * as path from 'path';
 import { WorkflowController, Phase } from '../controllers/WorkflowController';
 import { CliInvoker } from '../models/CliInvoker';
 import { CliService } from '../services/CliService';
-import { ARCHITECTURE_FILENAME, PLAN_FILENAME, REQUIREMENTS_FILENAME, ARTIFACTS_DIR } from '../constants';
+import { ARCHITECTURE_FILENAME, PLAN_FILENAME, REQUIREMENTS_FILENAME, ARTIFACTS_DIR, STALE_FILENAME } from '../constants';
 
 type RemakeStage = 'requirements' | 'architecture' | 'plan';
 
@@ -12,6 +14,13 @@ interface WorkspaceInfo {
     name: string;
 }
 
+interface SectionHeading {
+    title: string;
+    level: number;
+    /** Position among all headings of the document, passed as `--index` to tell duplicates apart. */
+    index: number;
+}
+
 interface RemakeDependencies {
     outputChannel: vscode.OutputChannel;
     cliInvoker: CliInvoker;
@@ -64,6 +73,78 @@ async function openArtifact(workspaceUri: vscode.Uri, relative: string): Promise
     }
 }
 
+/**
+ * Lists the Markdown headings of a document, skipping lines inside fenced code blocks.
+ */
+function parseSectionHeadings(markdown: string): SectionHeading[] {
+    const headings: SectionHeading[] = [];
+    let fence: string | undefined;
+    for (const line of markdown.split(/\r?\n/)) {
+        const trimmed = line.trim();
+        if (trimmed.startsWith('```') || trimmed.startsWith('~~~')) {
+            const marker = trimmed.slice(0, 3);
+            if (!fence) {
+                fence = marker;
+            } else if (marker === fence) {
+                fence = undefined;
+            }
+            continue;
+        }
+        if (fence) {
+            continue;
+        }
+        const match = /^(#{1,6})\s+(.*?)\s*#*\s*$/.exec(line);
+        if (match) {
+            headings.push({ level: match[1].length, title: match[2].trim(), index: headings.length });
+        }
+    }
+    return headings;
+}
+
+/**
+ * Only the Python CLI implements `remake-section`; the other bridge adapters reject it.
+ */
+function adapterSupportsSectionRemake(): boolean {
+    return (process.env.CODEMACHINE_CLI_ADAPTER || 'python') === 'python';
+}
+
+async function pickSection(workspaceRoot: string, stage: RemakeStage): Promise<SectionHeading | null | undefined> {
+    if (!adapterSupportsSectionRemake()) {
+        return null;
+    }
+    let content: string;
+    try {
+        content = await fs.readFile(path.join(workspaceRoot, ARTIFACTS_DIR, stageArtifacts[stage]), 'utf-8');
+    } catch {
+        return null;
+    }
+    const headings = parseSectionHeadings(content);
+    if (headings.length === 0) {
+        return null;
+    }
+    const items: (vscode.QuickPickItem & { heading: SectionHeading | null })[] = [
+        { label: 'Entire document', description: `Regenerate all of ${stageArtifacts[stage]}`, heading: null },
+        ...headings.map(heading => ({ label: heading.title, description: '#'.repeat(heading.level), heading })),
+    ];
+    const selection = await vscode.window.showQuickPick(items, {
+        placeHolder: `Remake the whole ${stage} document or a single section?`,
+    });
+    return selection ? selection.heading : undefined;
+}
+
+async function describeStaleArtifacts(workspaceRoot: string): Promise<string | undefined> {
+    try {
+        const content = await fs.readFile(path.join(workspaceRoot, ARTIFACTS_DIR, STALE_FILENAME), 'utf-8');
+        const stale: Record<string, Record<string, string>> = JSON.parse(content);
+        const parts = Object.entries(stale)
+            .filter(([, entries]) => Object.keys(entries).length > 0)
+            .map(([artifact, entries]) => `${artifact} (${Object.keys(entries).join(', ')})`);
+        return parts.length > 0 ? parts.join('; ') : undefined;
+    } catch {
+        return undefined;
+    }
+}
+
 export function registerRemakeCurrentStepCommand(
     context: vscode.ExtensionContext,
     workflowController: WorkflowController,
@@ -93,8 +174,15 @@ export function registerRemakeCurrentStepCommand(
             return;
         }
 
+        const section = await pickSection(workspace.root, stage);
+        if (section === undefined) {
+            return;
+        }
+
         const notes = await vscode.window.showInputBox({
-            prompt: `Add notes for remaking the ${stage} (optional)`,
+            prompt: section
+                ? `Add feedback for the "${section.title}" section (optional)`
+                : `Add notes for remaking the ${stage} (optional)`,
             placeHolder: 'e.g., Tighten auth flows and prefer Next.js over CRA',
         });
         if (notes === undefined) {
@@ -102,22 +190,38 @@ export function registerRemakeCurrentStepCommand(
         }
 
         deps.outputChannel.show(true);
-        const args = [
-            deps.cliInvoker.scriptPath,
-            'generate',
-            '--project-name',
-            workspace.name,
-            '--workspace-uri',
-            workspace.uri,
-            '--until',
-            stage,
-        ];
         const trimmedNotes = notes.trim();
+        const args = section
+            ? [
+                deps.cliInvoker.scriptPath,
+                'remake-section',
+                '--project-name',
+                workspace.name,
+                '--workspace-uri',
+                workspace.uri,
+                '--stage',
+                stage,
+                '--heading',
+                section.title,
+                '--index',
+                String(section.index),
+            ]
+            : [
+                deps.cliInvoker.scriptPath,
+                'generate',
+                '--project-name',
+                workspace.name,
+                '--workspace-uri',
+                workspace.uri,
+                '--until',
+                stage,
+            ];
         if (trimmedNotes.length > 0) {
-            args.push('--prompt', trimmedNotes);
+            args.push(section ? '--feedback' : '--prompt', trimmedNotes);
         }
 
-        const label = stage.charAt(0).toUpperCase() + stage.slice(1);
+        const stageLabel = stage.charAt(0).toUpperCase() + stage.slice(1);
+        const label = section ? `${stageLabel} section "${section.title}"` : stageLabel;
         const succeeded = await vscode.window.withProgress({
             location: vscode.ProgressLocation.Notification,
             title: `Remaking ${label}...`,
@@ -146,6 +250,12 @@ export function registerRemakeCurrentStepCommand(
         await openArtifact(vscode.Uri.file(workspace.root), stageArtifacts[stage]);
         const suffix = trimmedNotes.length > 0 ? ' with your notes.' : '.';
         vscode.window.showInformationMessage(`${label} remade${suffix}`);
+        if (section) {
+            const stale = await describeStaleArtifacts(workspace.root);
+            if (stale) {
+                vscode.window.showWarningMessage(`Downstream content references the changed section and is now stale: ${stale}`);
+            }
+        }
     });
 
     context.subscriptions.push(command);
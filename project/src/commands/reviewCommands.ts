@@ -59,14 +59,23 @@ export function registerReviewCommands(
         }
 
         try {
-            const todoJsonPath = path.join(workspaceRoot, ARTIFACTS_DIR, TODO_FILENAME);
-            const todoJsonContent = await fs.readFile(todoJsonPath, 'utf-8');
-            const plan: TodoPlan = JSON.parse(todoJsonContent);
-
-            const updated = findAndupdateTaskStatus(plan, taskId, 'done');
+            let updated: boolean;
+            if (await buildController.usesPlanStore()) {
+                // The CLI patches the task record in todo.jsonl, which the task tree reads.
+                await buildController.setTaskStatus(taskId, 'done');
+                updated = true;
+            } else {
+                const todoJsonPath = path.join(workspaceRoot, ARTIFACTS_DIR, TODO_FILENAME);
+                const todoJsonContent = await fs.readFile(todoJsonPath, 'utf-8');
+                const plan: TodoPlan = JSON.parse(todoJsonContent);
+
+                updated = findAndupdateTaskStatus(plan, taskId, 'done');
+                if (updated) {
+                    await fs.writeFile(todoJsonPath, JSON.stringify(plan, null, 2));
+                }
+            }
 
             if (updated) {
-                await fs.writeFile(todoJsonPath, JSON.stringify(plan, null, 2));
                 vscode.window.showInformationMessage(`Task ${taskId} accepted and marked as done.`);
                 
                 // Commit the staged changes
@@ -98,6 +107,14 @@ export function registerReviewCommands(
             return;
         }
 
+        if (buildController.hasPendingIterationWork()) {
+            // A hard reset would also discard the staged, uncommitted work of earlier tasks.
+            vscode.window.showErrorMessage(
+                `Cannot reject task ${taskId} while earlier tasks of the iteration are staged but not committed.`,
+            );
+            return;
+        }
+
         try {
             // Revert file system changes. 'HEAD' discards staged and unstaged changes.
             await gitService.resetHard('HEAD');
@@ -97,14 +97,27 @@ async function requestIterationApproval(iteration: Iteration): Promise<'run' | '
 async function runTasksInIteration(iteration: Iteration, buildController: BuildController): Promise<boolean> {
     const tasks = iteration.tasks ?? [];
     for (const task of tasks) {
+        let completed: boolean;
         try {
-            await buildController.runTask(task.id);
+            completed = await buildController.runIterationTask(task.id);
         } catch (error) {
             vscode.window.showErrorMessage(`Failed while executing task ${task.id}: ${error instanceof Error ? error.message : String(error)}`);
+            completed = false;
+        }
+        if (!completed) {
+            // Never commit a partially built iteration under the iteration's message.
+            buildController.abandonIteration(iteration.iteration_id);
             return false;
         }
     }
 
+    try {
+        await buildController.commitIteration(iteration.iteration_id);
+    } catch (error) {
+        vscode.window.showErrorMessage(`Failed to commit iteration ${iteration.iteration_id}: ${error instanceof Error ? error.message : String(error)}`);
+        return false;
+    }
+
     return true;
 }
 
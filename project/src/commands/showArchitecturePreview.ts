@@ -7,7 +7,7 @@ export function registerShowArchitecturePreviewCommand(context: vscode.Extension
 
         if (editor && editor.document.languageId === 'markdown') {
             const content = editor.document.getText();
-            ArchitecturePreview.createOrShow(context.extensionUri, content);
+            ArchitecturePreview.createOrShow(context.extensionUri, content, editor.document.uri);
         } else {
             vscode.window.showInformationMessage('Open a Markdown file to show the Architecture Preview.');
         }
@@ -3,4 +3,7 @@ export const REQUIREMENTS_FILENAME = 'requirements.md';
 export const ARCHITECTURE_FILENAME = 'architecture.md';
 export const PLAN_FILENAME = 'plan.md';
 export const TODO_FILENAME = 'todo.json';
+export const TODO_JSONL_FILENAME = 'todo.jsonl';
 export const PHASE_STATE_KEY = 'codeMachine.currentPhase';
+export const TOUCHED_PATHS_DIR = 'logs/touched';
+export const STALE_FILENAME = 'stale.json';
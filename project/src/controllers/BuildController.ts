@@ -1,12 +1,18 @@
 import * as vscode from 'vscode';
+import * as fs from 'fs/promises';
+import * as path from 'path';
 import { CliService } from '../services/CliService';
 import { GitService } from '../services/GitService';
 import { ReviewController } from './ReviewController';
 import { setActiveTaskId, markTaskCompleted } from '../state/TaskState';
 import { CliInvoker } from '../models/CliInvoker';
+import { ARTIFACTS_DIR, TODO_JSONL_FILENAME, TOUCHED_PATHS_DIR } from '../constants';
+
+export type CommitMode = 'task' | 'iteration';
 
 export class BuildController {
     private currentTaskId: string | undefined;
+    private uncommittedTasks: string[] = [];
 
     constructor(
         private readonly cliService: CliService,
@@ -26,7 +32,12 @@ export class BuildController {
         this.currentTaskId = undefined;
     }
 
-    private async executeTask(taskId: string, feedback?: string): Promise<void> {
+    /**
+     * Runs a task through the CLI and stages its changes. Results are committed right away unless
+     * `deferCommit` is set and the commit mode is `iteration`.
+     * @returns `true` when the task completed, `false` when it failed.
+     */
+    private async executeTask(taskId: string, feedback?: string, deferCommit = false): Promise<boolean> {
         this.outputChannel.appendLine(`\n--- Running Task: ${taskId} ---`);
         if (feedback) {
             this.outputChannel.appendLine(`> With feedback: ${feedback}`);
@@ -40,6 +51,8 @@ export class BuildController {
                 args.push('--feedback', feedback);
             }
 
+            // Drop any manifest from an earlier run so a stale path list is never staged.
+            await fs.rm(this.getTouchedManifestPath(taskId), { force: true });
             await this.cliService.execute(
                 this.cliInvoker.command,
                 [this.cliInvoker.scriptPath, ...args],
@@ -50,8 +63,33 @@ export class BuildController {
             
             this.outputChannel.appendLine(`Task ${taskId} completed successfully.`);
             
-            await this.gitService.stageAllChanges();
-            this.outputChannel.appendLine(`Changes for task ${taskId} staged.`);
+            const manifest = await this.readTouchedManifest(taskId);
+            if (manifest?.skipped) {
+                // The CLI reused the build recorded for unchanged task inputs; there is nothing to commit.
+                this.outputChannel.appendLine(`Task ${taskId} is unchanged since its last build; nothing to commit.`);
+                markTaskCompleted(taskId);
+                setActiveTaskId(undefined);
+                this.onTaskStateChanged();
+                vscode.window.showInformationMessage(`Task ${taskId} is unchanged since its last build; nothing was rebuilt.`);
+                return true;
+            }
+            const touchedPaths = manifest?.paths;
+            if (touchedPaths) {
+                await this.gitService.stagePaths(touchedPaths);
+                this.outputChannel.appendLine(`Changes for task ${taskId} staged (${touchedPaths.length} paths).`);
+            } else {
+                await this.gitService.stageAllChanges();
+                this.outputChannel.appendLine(`Changes for task ${taskId} staged.`);
+            }
+
+            if (deferCommit && this.getCommitMode() === 'iteration') {
+                this.uncommittedTasks.push(taskId);
+                this.outputChannel.appendLine(`Task ${taskId} will be committed with its iteration.`);
+                markTaskCompleted(taskId);
+                setActiveTaskId(undefined);
+                this.onTaskStateChanged();
+                return true;
+            }
 
             await this.gitService.commit(`feat(${taskId}): apply automated changes`);
             this.outputChannel.appendLine(`Committed results for task ${taskId}.`);
@@ -60,6 +98,7 @@ export class BuildController {
             setActiveTaskId(undefined);
             this.onTaskStateChanged();
             vscode.window.showInformationMessage(`Task ${taskId} finished. Diff logged to Code Machine output.`);
+            return true;
 
         } catch (error) {
             const errorMessage = `Failed to run task ${taskId}: ${error instanceof Error ? error.message : String(error)}`;
@@ -69,9 +108,108 @@ export class BuildController {
             this.currentTaskId = undefined;
             setActiveTaskId(undefined);
             this.onTaskStateChanged();
+            return false;
+        }
+    }
+
+    /**
+     * Whether tasks of the current iteration are staged but not yet committed.
+     */
+    public hasPendingIterationWork(): boolean {
+        return this.uncommittedTasks.length > 0;
+    }
+
+    /**
+     * Stops tracking staged iteration work without committing it, e.g. after a task in the
+     * iteration failed. The changes stay staged for manual review.
+     */
+    public abandonIteration(iterationId: string): void {
+        if (this.uncommittedTasks.length === 0) {
+            return;
+        }
+        this.outputChannel.appendLine(
+            `Iteration ${iterationId} was not committed; changes for ${this.uncommittedTasks.join(', ')} remain staged.`,
+        );
+        this.uncommittedTasks = [];
+    }
+
+    /**
+     * Commits every task staged since the last iteration commit. Only has an effect when
+     * `codemachine.build.commitMode` is set to `iteration`.
+     * @param iterationId The iteration whose tasks were just executed.
+     */
+    public async commitIteration(iterationId: string): Promise<void> {
+        if (this.uncommittedTasks.length === 0) {
+            return;
+        }
+        const tasks = this.uncommittedTasks;
+        this.uncommittedTasks = [];
+        await this.gitService.commit(`feat(${iterationId}): apply automated changes for ${tasks.join(', ')}`);
+        this.outputChannel.appendLine(`Committed results for iteration ${iterationId} (${tasks.length} tasks).`);
+        await this.reviewController.logDiffForLastCommit(this.outputChannel);
+        vscode.window.showInformationMessage(`Iteration ${iterationId} finished. Diff logged to Code Machine output.`);
+    }
+
+    /**
+     * Whether the CLI keeps the plan in the line-oriented store (`todo.jsonl`). Task statuses
+     * must then be written through the CLI, since the task tree reads them from that store.
+     */
+    public async usesPlanStore(): Promise<boolean> {
+        try {
+            await fs.access(path.join(this.workspaceRoot, ARTIFACTS_DIR, TODO_JSONL_FILENAME));
+            return true;
+        } catch {
+            return false;
         }
     }
 
+    /**
+     * Records a task status through the CLI's `set-task-status` command.
+     */
+    public async setTaskStatus(taskId: string, status: 'pending' | 'done' | 'failed'): Promise<void> {
+        const workspaceUri = vscode.Uri.file(this.workspaceRoot).toString();
+        // Only the Python CLI writes todo.jsonl, so the store is always updated through it.
+        const args = [
+            '--adapter', 'python',
+            'set-task-status',
+            '--task-id', taskId,
+            '--status', status,
+            '--workspace-uri', workspaceUri,
+        ];
+        await this.cliService.execute(
+            this.cliInvoker.command,
+            [this.cliInvoker.scriptPath, ...args],
+            this.outputChannel,
+            this.workspaceRoot,
+            { fallbackCommands: this.cliInvoker.fallback },
+        );
+    }
+
+    private getCommitMode(): CommitMode {
+        return vscode.workspace.getConfiguration('codemachine').get<CommitMode>('build.commitMode', 'task');
+    }
+
+    /**
+     * Reads the paths the CLI reported for a task, and whether it skipped an unchanged task.
+     * `paths` is `undefined` when the adapter did not write a manifest, in which case callers
+     * fall back to staging the whole tree.
+     */
+    private async readTouchedManifest(taskId: string): Promise<{ paths?: string[]; skipped: boolean } | undefined> {
+        try {
+            const manifest = JSON.parse(await fs.readFile(this.getTouchedManifestPath(taskId), 'utf-8'));
+            return {
+                paths: Array.isArray(manifest.paths) ? manifest.paths : undefined,
+                skipped: manifest.skipped === true,
+            };
+        } catch {
+            return undefined;
+        }
+    }
+
+    private getTouchedManifestPath(taskId: string): string {
+        return path.join(this.workspaceRoot, ARTIFACTS_DIR, TOUCHED_PATHS_DIR, `${taskId}.json`);
+    }
+
     public async runTask(taskId: string): Promise<void> {
         this.currentTaskId = taskId;
         setActiveTaskId(taskId);
@@ -80,6 +218,19 @@ export class BuildController {
         await this.executeTask(taskId);
     }
 
+    /**
+     * Runs a task as part of an iteration build; in `iteration` commit mode its changes are
+     * committed by `commitIteration`.
+     * @returns `true` when the task completed, `false` when it failed.
+     */
+    public async runIterationTask(taskId: string): Promise<boolean> {
+        this.currentTaskId = taskId;
+        setActiveTaskId(taskId);
+        vscode.commands.executeCommand('setContext', 'codeMachine.currentTask', taskId);
+        this.onTaskStateChanged();
+        return this.executeTask(taskId, undefined, true);
+    }
+
     public async retryTask(taskId: string, feedback: string): Promise<void> {
         this.currentTaskId = taskId;
         setActiveTaskId(taskId);
@@ -100,12 +100,14 @@ export function activate(context: vscode.ExtensionContext) {
 		if (!folders || folders.length === 0) {
 			workspaceServices = undefined;
 			outputChannel.appendLine('All workspace folders have been closed. Code Machine commands are paused.');
+			taskTreeProvider.clearPlanCache();
 			taskTreeProvider.refresh();
 			artifactsTreeProvider.refresh();
 			return;
 		}
 
 		ensureWorkspaceServices();
+		taskTreeProvider.clearPlanCache();
 		taskTreeProvider.refresh();
 		artifactsTreeProvider.refresh();
 	});
@@ -3,7 +3,15 @@ import * as path from 'path';
 import { WorkflowController } from '../controllers/WorkflowController';
 import { TaskTreeProvider } from '../views/sidebar/TaskTreeProvider';
 import { ArtifactsTreeProvider } from '../views/sidebar/ArtifactsTreeProvider';
-import { ARTIFACTS_DIR, TODO_FILENAME } from '../constants';
+import { ArchitecturePreview } from '../views/webviews/ArchitecturePreview';
+import { ARCHITECTURE_FILENAME, ARTIFACTS_DIR, TODO_FILENAME, TODO_JSONL_FILENAME } from '../constants';
+
+type ArtifactEventKind = 'created' | 'changed' | 'deleted';
+
+// Streaming and parallel CLI writes fire many events per second; they are coalesced so the
+// trees refresh at most once per window, and at least once per max wait while writes continue.
+const DEBOUNCE_MS = 200;
+const MAX_WAIT_MS = 1000;
 
 export class ArtifactWatcher implements vscode.Disposable {
     private _watcher: vscode.FileSystemWatcher;
@@ -11,6 +19,9 @@ export class ArtifactWatcher implements vscode.Disposable {
     private _taskTreeProvider: TaskTreeProvider;
     private _artifactsTreeProvider?: ArtifactsTreeProvider;
     private _outputChannel: vscode.OutputChannel;
+    private _pendingEvents = new Map<string, { uri: vscode.Uri; kind: ArtifactEventKind }>();
+    private _flushTimer: NodeJS.Timeout | undefined;
+    private _firstPendingAt = 0;
 
     constructor(
         workflowController: WorkflowController,
@@ -24,41 +35,62 @@ export class ArtifactWatcher implements vscode.Disposable {
         this._outputChannel = outputChannel;
 
         // A robust pattern to watch for artifacts in any subfolder of the workspace
-        const globPattern = `**/${ARTIFACTS_DIR}/*.{md,json}`;
+        const globPattern = `**/${ARTIFACTS_DIR}/*.{md,json,jsonl}`;
         this._watcher = vscode.workspace.createFileSystemWatcher(globPattern);
 
-        this._watcher.onDidCreate(uri => this.onArtifactCreated(uri));
-        this._watcher.onDidChange(uri => this.onArtifactChanged(uri));
-        this._watcher.onDidDelete(uri => this.onArtifactDeleted(uri));
+        this._watcher.onDidCreate(uri => this.enqueue(uri, 'created'));
+        this._watcher.onDidChange(uri => this.enqueue(uri, 'changed'));
+        this._watcher.onDidDelete(uri => this.enqueue(uri, 'deleted'));
     }
 
-    private onArtifactCreated(uri: vscode.Uri): void {
-        this._outputChannel.appendLine(`Artifact created: ${uri.fsPath}`);
-        this._workflowController.updatePhaseFromArtifact(uri);
-        this._artifactsTreeProvider?.refresh();
-        if (path.basename(uri.fsPath) === TODO_FILENAME) {
-            this._taskTreeProvider.refresh();
+    private enqueue(uri: vscode.Uri, kind: ArtifactEventKind): void {
+        const key = uri.toString();
+        const previous = this._pendingEvents.get(key);
+        // A file created within the window is still new to the trees even if it changed since.
+        const effectiveKind = previous?.kind === 'created' && kind === 'changed' ? 'created' : kind;
+        this._pendingEvents.set(key, { uri, kind: effectiveKind });
+
+        const now = Date.now();
+        if (this._flushTimer) {
+            clearTimeout(this._flushTimer);
+        } else {
+            this._firstPendingAt = now;
         }
+        const delay = Math.max(0, Math.min(DEBOUNCE_MS, this._firstPendingAt + MAX_WAIT_MS - now));
+        this._flushTimer = setTimeout(() => this.flush(), delay);
     }
 
-    private onArtifactChanged(uri: vscode.Uri): void {
-        this._outputChannel.appendLine(`Artifact changed: ${uri.fsPath}`);
-        this._workflowController.updatePhaseFromArtifact(uri);
-        this._artifactsTreeProvider?.refresh();
-        if (path.basename(uri.fsPath) === TODO_FILENAME) {
-            this._taskTreeProvider.refresh();
+    private flush(): void {
+        this._flushTimer = undefined;
+        const events = Array.from(this._pendingEvents.values());
+        this._pendingEvents.clear();
+
+        let todoTouched = false;
+        for (const { uri, kind } of events) {
+            this._outputChannel.appendLine(`Artifact ${kind}: ${uri.fsPath}`);
+            if (kind !== 'deleted') {
+                this._workflowController.updatePhaseFromArtifact(uri);
+                if (path.basename(uri.fsPath) === ARCHITECTURE_FILENAME) {
+                    void ArchitecturePreview.refreshFromFile(uri);
+                }
+            }
+            const filename = path.basename(uri.fsPath);
+            if (filename === TODO_FILENAME || filename === TODO_JSONL_FILENAME) {
+                todoTouched = true;
+            }
         }
-    }
 
-    private onArtifactDeleted(uri: vscode.Uri): void {
-        this._outputChannel.appendLine(`Artifact deleted: ${uri.fsPath}`);
         this._artifactsTreeProvider?.refresh();
-        if (path.basename(uri.fsPath) === TODO_FILENAME) {
-            this._taskTreeProvider.refresh();
+        if (todoTouched) {
+            void this._taskTreeProvider.refreshPlan();
         }
     }
 
     public dispose() {
+        if (this._flushTimer) {
+            clearTimeout(this._flushTimer);
+            this._flushTimer = undefined;
+        }
         this._watcher.dispose();
     }
 }
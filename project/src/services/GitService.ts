@@ -1,4 +1,6 @@
 import { simpleGit, SimpleGit, SimpleGitOptions } from 'simple-git';
+import * as fs from 'fs/promises';
+import * as path from 'path';
 
 export class GitService {
     // Making the git instance public for verification purposes in tests
@@ -43,6 +45,53 @@ export class GitService {
         }
     }
 
+    /**
+     * Stages only the given workspace-relative paths with `git add -A`, so directories are expanded,
+     * deletions are recorded and .gitignore is honoured. Paths that exist neither on disk nor in
+     * the index, and paths that are ignored, are skipped.
+     * @param paths The file or directory paths to stage.
+     */
+    public async stagePaths(paths: string[]): Promise<void> {
+        if (paths.length === 0) {
+            return;
+        }
+        try {
+            const tracked = (await this.git.raw(['ls-files', '--cached', '--', ...paths]))
+                .split('\n')
+                .filter(line => line.length > 0);
+            const present: string[] = [];
+            for (const entry of paths) {
+                const normalized = entry.replace(/\/+$/, '');
+                const onDisk = await fs.stat(path.join(this.cwd, normalized)).then(() => true, () => false);
+                if (onDisk || tracked.some(file => file === normalized || file.startsWith(`${normalized}/`))) {
+                    present.push(normalized);
+                }
+            }
+            const ignored = new Set(await this.getIgnoredPaths(present));
+            const stageable = present.filter(entry => !ignored.has(entry));
+            if (stageable.length === 0) {
+                return;
+            }
+            await this.git.raw(['add', '-A', '--', ...stageable]);
+        } catch (error) {
+            console.error('Failed to stage paths:', error);
+            throw error;
+        }
+    }
+
+    private async getIgnoredPaths(paths: string[]): Promise<string[]> {
+        if (paths.length === 0) {
+            return [];
+        }
+        try {
+            const output = await this.git.raw(['check-ignore', '--', ...paths]);
+            return output.split('\n').filter(line => line.length > 0);
+        } catch {
+            // check-ignore exits with 1 when none of the paths is ignored.
+            return [];
+        }
+    }
+
     /**
      * Commits staged changes with a given message.
      * @param message The commit message.
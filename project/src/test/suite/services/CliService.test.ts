@@ -82,6 +82,77 @@ suite('CliService Test Suite', () => {
         assert.ok(output.includes('> Command finished with exit code 0.'), 'Should log successful exit code');
     });
 
+    test('should regenerate a single section and keep the rest of the document', async () => {
+        const generateArgs = [
+            bridgePath,
+            'generate',
+            '--project-name',
+            'Section Project',
+            '--prompt',
+            'Sample prompt',
+            '--workspace-uri',
+            workspaceUri,
+            '--until',
+            'requirements',
+        ];
+        await cliService.execute('node', generateArgs, mockOutputChannel);
+        const requirementsPath = path.join(workspaceDir, ARTIFACTS_DIR, REQUIREMENTS_FILENAME);
+        const before = await fs.readFile(requirementsPath, 'utf-8');
+
+        await cliService.execute(
+            'node',
+            [
+                bridgePath,
+                'remake-section',
+                '--stage',
+                'requirements',
+                '--heading',
+                'Data',
+                '--feedback',
+                'Keep artifacts per run',
+                '--workspace-uri',
+                workspaceUri,
+            ],
+            mockOutputChannel
+        );
+
+        const after = await fs.readFile(requirementsPath, 'utf-8');
+        assert.ok(after.includes('Revised per feedback: Keep artifacts per run'), 'Section should include the feedback revision');
+        const untouched = before.slice(0, before.indexOf('## Data'));
+        assert.ok(after.startsWith(untouched), 'Sections before the remade one should be unchanged');
+        assert.ok(after.includes('## Acceptance Tests'), 'Sections after the remade one should be kept');
+    });
+
+    test('should skip unchanged tasks, including dependents, on a second project run', async () => {
+        const projectArgs = [
+            bridgePath,
+            'project',
+            '--project-name',
+            'Incremental Project',
+            '--prompt',
+            'Sample prompt',
+            '--auto-approve',
+            '--no-qa',
+            '--explain',
+            '--workspace-uri',
+            workspaceUri,
+        ];
+        await cliService.execute('node', projectArgs, mockOutputChannel);
+        const todoPath = path.join(workspaceDir, ARTIFACTS_DIR, TODO_FILENAME);
+        const plan = JSON.parse(await fs.readFile(todoPath, 'utf-8'));
+        plan[0].tasks[1].dependencies = [plan[0].tasks[0].id];
+        await fs.writeFile(todoPath, JSON.stringify(plan, null, 2));
+        // Records the build of the dependent task against its new dependency.
+        await cliService.execute('node', projectArgs, mockOutputChannel);
+        output = '';
+
+        await cliService.execute('node', projectArgs, mockOutputChannel);
+
+        assert.ok(output.includes('Skipping I1.T1'), 'Unchanged task should be skipped');
+        assert.ok(output.includes('Skipping I1.T2'), 'Unchanged task depending on I1.T1 should be skipped');
+        assert.ok(!output.includes('Rebuilding'), 'Nothing should be rebuilt when no input changed');
+    });
+
     test('should reject promise when mock_cli.py exits with non-zero code', async () => {
         await assert.rejects(
             async () => {
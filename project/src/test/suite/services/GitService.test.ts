@@ -131,4 +131,39 @@ suite('GitService Test Suite', () => {
         staged = await gitService.getStagedChanges();
         assert.deepStrictEqual(staged, [file1], 'Should not list unstaged files');
     });
+
+    test('stagePaths should stage only the given paths, including deletions', async () => {
+        await gitService.init();
+        const tracked = 'tracked.txt';
+        const touched = 'touched.txt';
+        const untouched = 'untouched.txt';
+
+        await fs.writeFile(path.join(testRepoPath, tracked), 'content');
+        await gitService.stageAllChanges();
+        await gitService.commit('Initial commit');
+
+        await fs.rm(path.join(testRepoPath, tracked));
+        await fs.writeFile(path.join(testRepoPath, touched), 'new');
+        await fs.writeFile(path.join(testRepoPath, untouched), 'new');
+
+        await gitService.stagePaths([tracked, touched, 'never-created.txt']);
+        const staged = await gitService.getStagedChanges();
+        assert.deepStrictEqual(staged.sort(), [tracked, touched].sort(), 'Should stage only the reported paths');
+
+        const status = await rawGit.status();
+        assert.ok(status.not_added.includes(untouched), 'Unreported files should stay unstaged');
+    });
+
+    test('stagePaths should expand directories and skip ignored files', async () => {
+        await gitService.init();
+        await fs.writeFile(path.join(testRepoPath, '.gitignore'), '*.log\n');
+        await fs.mkdir(path.join(testRepoPath, 'src'));
+        await fs.writeFile(path.join(testRepoPath, 'src', 'main.ts'), 'code');
+        await fs.writeFile(path.join(testRepoPath, 'src', 'debug.log'), 'noise');
+        await fs.writeFile(path.join(testRepoPath, 'ig.log'), 'noise');
+
+        await gitService.stagePaths(['src', 'ig.log']);
+        const staged = await gitService.getStagedChanges();
+        assert.deepStrictEqual(staged, ['src/main.ts'], 'Should stage directory contents but not ignored files');
+    });
 });
\ No newline at end of file
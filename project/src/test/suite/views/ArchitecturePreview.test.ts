@@ -0,0 +1,57 @@
+import * as assert from 'assert';
+import { diffPreviewSections, SectionRenderer, splitPreviewSections } from '../../../views/webviews/ArchitecturePreview';
+
+const DOCUMENT = [
+    '# Architecture',
+    '',
+    '## Components',
+    '- Planner',
+    '',
+    '## Critical Flow',
+    '```mermaid',
+    'sequenceDiagram',
+    '    User->>Planner: describe goal',
+    '```',
+].join('\n');
+
+suite('ArchitecturePreview Rendering Test Suite', () => {
+    test('splitPreviewSections should split at headings outside code fences', () => {
+        const sections = splitPreviewSections(['# Title', '```', '# not a heading', '```', '## Next', 'body'].join('\n'));
+
+        assert.deepStrictEqual(sections, ['# Title\n```\n# not a heading\n```', '## Next\nbody']);
+    });
+
+    test('SectionRenderer should emit mermaid placeholders and reuse cached sections', () => {
+        const renderer = new SectionRenderer();
+        const first = renderer.render(DOCUMENT);
+
+        assert.strictEqual(first.length, 3);
+        assert.ok(/<div class="mermaid" data-diagram="[0-9a-f]{40}">/.test(first[2].html));
+        assert.ok(first[2].html.includes('User-&gt;&gt;Planner'));
+
+        const second = renderer.render(DOCUMENT.replace('- Planner', '- Planner\n- Builder'));
+        assert.strictEqual(renderer.cacheSize, 4);
+        assert.strictEqual(second[0].key, first[0].key);
+        assert.notStrictEqual(second[1].key, first[1].key);
+        assert.strictEqual(second[2].key, first[2].key);
+    });
+
+    test('diffPreviewSections should only send sections the webview does not have', () => {
+        const renderer = new SectionRenderer();
+        const before = renderer.render(DOCUMENT);
+        const after = renderer.render(DOCUMENT.replace('- Planner', '- Builder'));
+
+        const update = diffPreviewSections(new Set(before.map(section => section.key)), after);
+
+        assert.deepStrictEqual(update.order, after.map(section => section.key));
+        assert.deepStrictEqual(Object.keys(update.sections), [after[1].key]);
+    });
+
+    test('SectionRenderer should give repeated sections distinct keys', () => {
+        const renderer = new SectionRenderer();
+        const sections = renderer.render('## Notes\nSame\n## Notes\nSame');
+
+        assert.strictEqual(sections.length, 2);
+        assert.notStrictEqual(sections[0].key, sections[1].key);
+    });
+});
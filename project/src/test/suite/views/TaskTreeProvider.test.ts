@@ -0,0 +1,62 @@
+import * as assert from 'assert';
+import { diffPlannerIndexes, indexPlannerItems, parsePlanStore, PlannerItem } from '../../../views/sidebar/TaskTreeProvider';
+
+function task(id: string, description: string, status: 'pending' | 'done' | 'failed' = 'pending'): PlannerItem {
+    return { type: 'task', task: { id, description, status } };
+}
+
+function iteration(label: string, children: PlannerItem[], description?: string): PlannerItem {
+    return { type: 'iteration', label, description, children };
+}
+
+suite('TaskTreeProvider Plan Diff Test Suite', () => {
+    test('indexPlannerItems should assign stable, unique keys', () => {
+        const index = indexPlannerItems([
+            iteration('I1', [task('task', 'First'), task('task', 'Second')]),
+        ]);
+
+        assert.deepStrictEqual(index.rootKeys, ['/i:I1']);
+        assert.deepStrictEqual(index.entries.get('/i:I1')?.childKeys, ['/i:I1/t:task', '/i:I1/t:task#1']);
+    });
+
+    test('diffPlannerIndexes should report only nodes whose content changed', () => {
+        const previous = indexPlannerItems([
+            iteration('I1', [task('I1.T1', 'First'), task('I1.T2', 'Second')]),
+            iteration('I2', [task('I2.T1', 'Third')]),
+        ]);
+        const next = indexPlannerItems([
+            iteration('I1', [task('I1.T1', 'First'), task('I1.T2', 'Second', 'done')]),
+            iteration('I2', [task('I2.T1', 'Third')]),
+        ]);
+
+        const diff = diffPlannerIndexes(previous, next);
+        assert.strictEqual(diff.rootChanged, false);
+        assert.deepStrictEqual(diff.changedKeys, ['/i:I1/t:I1.T2']);
+    });
+
+    test('diffPlannerIndexes should flag the parent when children are added or removed', () => {
+        const previous = indexPlannerItems([iteration('I1', [task('I1.T1', 'First')])]);
+        const added = indexPlannerItems([iteration('I1', [task('I1.T1', 'First'), task('I1.T2', 'Second')])]);
+        const reordered = indexPlannerItems([iteration('I2', []), iteration('I1', [task('I1.T1', 'First')])]);
+
+        assert.deepStrictEqual(diffPlannerIndexes(previous, added), { rootChanged: false, changedKeys: ['/i:I1'] });
+        assert.strictEqual(diffPlannerIndexes(previous, reordered).rootChanged, true);
+    });
+
+    test('parsePlanStore should rebuild the tree and let later records supersede earlier ones', () => {
+        const lines = [
+            '{"kind":"iteration","parent":null,"iteration_id":"I1","description":"Foundation","status":"pending"}',
+            '{"kind":"task","parent":"I1","id":"I1.T1","description":"First","status":"pending"}      ',
+            '{"kind":"iteration","parent":"I1","iteration_id":"I1.1","status":"pending"}',
+            '{"kind":"task","parent":"I1.1","id":"I1.1.T1","description":"Nested","status":"pending"}',
+            '{"kind":"task","parent":"I1","id":"I1.T1","description":"First","status":"done"}',
+            '',
+        ];
+
+        const plan = parsePlanStore(lines.join('\n'));
+
+        assert.strictEqual(plan.length, 1);
+        assert.deepStrictEqual(plan[0].tasks, [{ id: 'I1.T1', description: 'First', status: 'done' }]);
+        assert.strictEqual(plan[0].iterations?.[0].tasks?.[0].id, 'I1.1.T1');
+    });
+});
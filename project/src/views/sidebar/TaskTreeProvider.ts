@@ -1,61 +1,209 @@
 import * as vscode from 'vscode';
+import { createHash } from 'crypto';
 
 import { Iteration, Task } from '../../models/task';
 import { WorkflowController, Phase } from '../../controllers/WorkflowController';
-import { ARTIFACTS_DIR, TODO_FILENAME } from '../../constants';
+import { ARTIFACTS_DIR, TODO_FILENAME, TODO_JSONL_FILENAME } from '../../constants';
 import { getActiveTaskId, isTaskCompleted } from '../../state/TaskState';
 
 type TaskPlannerItem = { type: 'task'; task: Task };
 type IterationPlannerItem = { type: 'iteration'; label: string; description?: string; children: PlannerItem[] };
-type PlannerItem = IterationPlannerItem | TaskPlannerItem;
+export type PlannerItem = IterationPlannerItem | TaskPlannerItem;
 type TaskTreeNode = PlanTreeItem | BuildProcessActionItem;
 
+interface IndexedPlannerItem {
+  item: PlannerItem;
+  childKeys: string[];
+  signature: string;
+}
+
+export interface PlannerIndex {
+  rootKeys: string[];
+  entries: Map<string, IndexedPlannerItem>;
+}
+
+export interface PlannerDiff {
+  rootChanged: boolean;
+  changedKeys: string[];
+}
+
+interface CachedPlan {
+  uri: vscode.Uri;
+  mtime: number;
+  hash: string;
+  index: PlannerIndex;
+}
+
 export class TaskTreeProvider implements vscode.TreeDataProvider<TaskTreeNode> {
-  private _onDidChangeTreeData: vscode.EventEmitter<TaskTreeNode | undefined | null | void> = new vscode.EventEmitter();
-  readonly onDidChangeTreeData: vscode.Event<TaskTreeNode | undefined | null | void> = this._onDidChangeTreeData.event;
+  private _onDidChangeTreeData: vscode.EventEmitter<TaskTreeNode | TaskTreeNode[] | undefined | null | void> = new vscode.EventEmitter();
+  readonly onDidChangeTreeData: vscode.Event<TaskTreeNode | TaskTreeNode[] | undefined | null | void> = this._onDidChangeTreeData.event;
+  private planCache: CachedPlan | undefined;
+  private readonly nodes = new Map<string, PlanTreeItem>();
 
   constructor(private readonly workflowController: WorkflowController) {}
 
   refresh(): void {
+    this.nodes.clear();
     this._onDidChangeTreeData.fire();
   }
 
+  /**
+   * Forgets the cached plan location and contents, e.g. after the workspace folder changed.
+   */
+  clearPlanCache(): void {
+    this.planCache = undefined;
+  }
+
+  /**
+   * Re-reads the plan after it changed on disk and only notifies the nodes whose content or
+   * children changed. Falls back to a full refresh when top-level iterations change or the
+   * plan cannot be read.
+   */
+  async refreshPlan(): Promise<void> {
+    const previous = this.planCache;
+    let current: CachedPlan | undefined;
+    try {
+      current = await this.loadPlan();
+    } catch {
+      current = undefined;
+    }
+    if (current && current === previous) {
+      return;
+    }
+    if (!previous || !current) {
+      this.refresh();
+      return;
+    }
+
+    const diff = diffPlannerIndexes(previous.index, current.index);
+    if (diff.rootChanged) {
+      this.refresh();
+      return;
+    }
+
+    const changed: PlanTreeItem[] = [];
+    for (const key of diff.changedKeys) {
+      const node = this.nodes.get(key);
+      const entry = current.index.entries.get(key);
+      if (node && entry) {
+        node.update(entry.item);
+        changed.push(node);
+      }
+    }
+    for (const key of Array.from(this.nodes.keys())) {
+      if (!current.index.entries.has(key)) {
+        this.nodes.delete(key);
+      }
+    }
+    if (changed.length > 0) {
+      this._onDidChangeTreeData.fire(changed);
+    }
+  }
+
   getTreeItem(element: TaskTreeNode): vscode.TreeItem {
     return element;
   }
 
   async getChildren(element?: TaskTreeNode): Promise<TaskTreeNode[]> {
     if (element) {
-      if (!(element instanceof PlanTreeItem)) {
+      if (!(element instanceof PlanTreeItem) || !this.planCache) {
         return [];
       }
-      if (element.contextValue === 'iteration') {
-        return (element.children || []).map(child =>
-          new PlanTreeItem(child, child.type === 'task' ? vscode.TreeItemCollapsibleState.None : vscode.TreeItemCollapsibleState.Collapsed),
-        );
-      }
-      return [];
-    }
-
-    const todoFiles = await vscode.workspace.findFiles(`**/${ARTIFACTS_DIR}/${TODO_FILENAME}`, '**/node_modules/**', 1);
-    if (todoFiles.length === 0) {
-      return [new BuildProcessActionItem(false, this.workflowController.currentPhase === Phase.Build)];
+      const entry = this.planCache.index.entries.get(element.key);
+      return entry ? this.getNodes(entry.childKeys) : [];
     }
 
+    let plan: CachedPlan | undefined;
     try {
-      const todoJsonUri = todoFiles[0];
-      const fileContent = await vscode.workspace.fs.readFile(todoJsonUri);
-      const parsed = JSON.parse(Buffer.from(fileContent).toString('utf8'));
-      const plannerItems = this.normalizePlannerItems(parsed);
-      const nodes = plannerItems.map(item =>
-        new PlanTreeItem(item, item.type === 'task' ? vscode.TreeItemCollapsibleState.None : vscode.TreeItemCollapsibleState.Collapsed),
-      );
-      return [new BuildProcessActionItem(true, this.workflowController.currentPhase === Phase.Build), ...nodes];
+      plan = await this.loadPlan();
     } catch (error) {
       console.error('Error parsing todo.json:', error);
       vscode.window.showErrorMessage('Failed to parse todo.json. Check the file for syntax errors.');
       return [new BuildProcessActionItem(false, this.workflowController.currentPhase === Phase.Build, true)];
     }
+    if (!plan) {
+      return [new BuildProcessActionItem(false, this.workflowController.currentPhase === Phase.Build)];
+    }
+    return [new BuildProcessActionItem(true, this.workflowController.currentPhase === Phase.Build), ...this.getNodes(plan.index.rootKeys)];
+  }
+
+  private getNodes(keys: string[]): PlanTreeItem[] {
+    const entries = this.planCache?.index.entries;
+    const nodes: PlanTreeItem[] = [];
+    for (const key of keys) {
+      const entry = entries?.get(key);
+      if (!entry) {
+        continue;
+      }
+      let node = this.nodes.get(key);
+      if (!node) {
+        node = new PlanTreeItem(key, entry.item);
+        this.nodes.set(key, node);
+      }
+      nodes.push(node);
+    }
+    return nodes;
+  }
+
+  /**
+   * Returns the parsed plan, reusing the cached copy while the plan file keeps the same mtime or
+   * content hash. The CLI's line-oriented store (todo.jsonl) is preferred over todo.json when
+   * it exists, since task statuses are only patched there. Resolves to `undefined` when there
+   * is no plan and throws on invalid JSON.
+   */
+  private async loadPlan(): Promise<CachedPlan | undefined> {
+    const located = await this.locateTodo();
+    if (!located) {
+      this.planCache = undefined;
+      return undefined;
+    }
+
+    const cached = this.planCache;
+    const sameFile = cached !== undefined && cached.uri.toString() === located.uri.toString();
+    if (cached && sameFile && cached.mtime === located.mtime) {
+      return cached;
+    }
+
+    const fileContent = await vscode.workspace.fs.readFile(located.uri);
+    const hash = createHash('sha1').update(fileContent).digest('hex');
+    if (cached && sameFile && cached.hash === hash) {
+      cached.mtime = located.mtime;
+      return cached;
+    }
+
+    const text = Buffer.from(fileContent).toString('utf8');
+    const parsed = located.uri.path.endsWith(`/${TODO_JSONL_FILENAME}`) ? parsePlanStore(text) : JSON.parse(text);
+    this.planCache = {
+      uri: located.uri,
+      mtime: located.mtime,
+      hash,
+      index: indexPlannerItems(this.normalizePlannerItems(parsed)),
+    };
+    return this.planCache;
+  }
+
+  private async locateTodo(): Promise<{ uri: vscode.Uri; mtime: number } | undefined> {
+    if (this.planCache) {
+      // Check the store first so a todo.jsonl created next to the cached todo.json takes over.
+      const artifactsDir = vscode.Uri.joinPath(this.planCache.uri, '..');
+      for (const filename of [TODO_JSONL_FILENAME, TODO_FILENAME]) {
+        const uri = vscode.Uri.joinPath(artifactsDir, filename);
+        try {
+          const stat = await vscode.workspace.fs.stat(uri);
+          return { uri, mtime: stat.mtime };
+        } catch {
+          // Try the next plan file, then search the workspace again.
+        }
+      }
+    }
+    for (const filename of [TODO_JSONL_FILENAME, TODO_FILENAME]) {
+      const todoFiles = await vscode.workspace.findFiles(`**/${ARTIFACTS_DIR}/${filename}`, '**/node_modules/**', 1);
+      if (todoFiles.length > 0) {
+        const stat = await vscode.workspace.fs.stat(todoFiles[0]);
+        return { uri: todoFiles[0], mtime: stat.mtime };
+      }
+    }
+    return undefined;
   }
 
   private normalizePlannerItems(data: any): PlannerItem[] {
@@ -104,17 +252,23 @@ export class TaskTreeProvider implements vscode.TreeDataProvider<TaskTreeNode> {
 }
 
 class PlanTreeItem extends vscode.TreeItem {
-  public readonly children?: PlannerItem[];
+  public data: PlannerItem;
 
-  constructor(public readonly data: PlannerItem, collapsibleState: vscode.TreeItemCollapsibleState) {
-    const label = data.type === 'iteration' ? data.label : `${data.task.id}: ${data.task.description}`;
-    super(label, collapsibleState);
+  constructor(public readonly key: string, data: PlannerItem) {
+    super('', data.type === 'task' ? vscode.TreeItemCollapsibleState.None : vscode.TreeItemCollapsibleState.Collapsed);
+    this.id = key;
+    this.data = data;
+    this.update(data);
+  }
 
+  update(data: PlannerItem): void {
+    this.data = data;
     if (data.type === 'iteration') {
+      this.label = data.label;
       this.contextValue = 'iteration';
       this.description = data.description;
-      this.children = data.children;
     } else {
+      this.label = `${data.task.id}: ${data.task.description}`;
       this.contextValue = 'task';
       this.tooltip = `${data.task.description}\nStatus: ${data.task.status}`;
       const status = getVisualStatus(data.task);
@@ -124,9 +278,106 @@ class PlanTreeItem extends vscode.TreeItem {
         this.iconPath = new vscode.ThemeIcon('check');
       } else if (status === 'failed') {
         this.iconPath = new vscode.ThemeIcon('error');
+      } else {
+        this.iconPath = undefined;
+      }
+    }
+  }
+}
+
+/**
+ * Rebuilds the nested iteration tree from the CLI's line-oriented plan store. Every line is an
+ * iteration or task record with `kind` and `parent` fields; a later record for the same
+ * iteration or task supersedes earlier ones but keeps the position of the first.
+ */
+export function parsePlanStore(content: string): Iteration[] {
+  const order: string[] = [];
+  const records = new Map<string, any>();
+  for (const line of content.split('\n')) {
+    if (!line.trim()) {
+      continue;
+    }
+    const record = JSON.parse(line);
+    const key = record.kind === 'iteration'
+      ? `iteration:${record.iteration_id || 'Iter'}`
+      : `task:${record.task_id || record.id}`;
+    if (!records.has(key)) {
+      order.push(key);
+    }
+    records.set(key, record);
+  }
+
+  const iterations = new Map<string, Iteration>();
+  const roots: Iteration[] = [];
+  for (const key of order) {
+    const { kind, parent, ...fields } = records.get(key);
+    if (kind === 'iteration') {
+      const iteration: Iteration = { ...fields, iteration_id: fields.iteration_id || 'Iter' };
+      iterations.set(iteration.iteration_id, iteration);
+      const parentIteration = iterations.get(parent);
+      if (parentIteration) {
+        if (!parentIteration.iterations) {
+          parentIteration.iterations = [];
+        }
+        parentIteration.iterations.push(iteration);
+      } else {
+        roots.push(iteration);
+      }
+    } else {
+      const parentIteration = iterations.get(parent);
+      if (parentIteration) {
+        const task = { ...fields, id: fields.task_id || fields.id } as Task;
+        if (!parentIteration.tasks) {
+          parentIteration.tasks = [];
+        }
+        parentIteration.tasks.push(task);
       }
     }
   }
+  return roots;
+}
+
+/**
+ * Assigns every planner item a stable key derived from its position in the iteration tree so
+ * that successive parses of todo.json can be compared node by node.
+ */
+export function indexPlannerItems(items: PlannerItem[]): PlannerIndex {
+  const entries = new Map<string, IndexedPlannerItem>();
+  const visit = (level: PlannerItem[], parentKey: string): string[] => {
+    const seen = new Map<string, number>();
+    return level.map(item => {
+      const base = item.type === 'iteration' ? `${parentKey}/i:${item.label}` : `${parentKey}/t:${item.task.id}`;
+      const occurrence = seen.get(base) ?? 0;
+      seen.set(base, occurrence + 1);
+      const key = occurrence === 0 ? base : `${base}#${occurrence}`;
+      const childKeys = item.type === 'iteration' ? visit(item.children, key) : [];
+      const signature = item.type === 'iteration'
+        ? JSON.stringify([item.label, item.description])
+        : JSON.stringify(item.task);
+      entries.set(key, { item, childKeys, signature });
+      return key;
+    });
+  };
+  return { rootKeys: visit(items, ''), entries };
+}
+
+/**
+ * Lists the keys of nodes present in both indexes whose own fields or child list changed.
+ * Added and removed nodes surface as a child-list change on their parent.
+ */
+export function diffPlannerIndexes(previous: PlannerIndex, next: PlannerIndex): PlannerDiff {
+  const changedKeys: string[] = [];
+  next.entries.forEach((entry, key) => {
+    const old = previous.entries.get(key);
+    if (old && (old.signature !== entry.signature || !sameKeys(old.childKeys, entry.childKeys))) {
+      changedKeys.push(key);
+    }
+  });
+  return { rootChanged: !sameKeys(previous.rootKeys, next.rootKeys), changedKeys };
+}
+
+function sameKeys(a: string[], b: string[]): boolean {
+  return a.length === b.length && a.every((key, i) => key === b[i]);
 }
 
 function getVisualStatus(task: Task): 'pending' | 'active' | 'done' | 'failed' {
@@ -1,5 +1,11 @@
 import * as vscode from 'vscode';
 import * as MarkdownIt from 'markdown-it';
+import { createHash } from 'crypto';
+
+// Rendered sections are reused across updates; the bound keeps long editing sessions in check.
+const SECTION_CACHE_LIMIT = 256;
+// Typing and streamed CLI writes arrive in bursts; coalesce them into one webview update.
+const UPDATE_DEBOUNCE_MS = 150;
 
 function getNonce() {
     let text = '';
@@ -10,6 +16,130 @@ function getNonce() {
     return text;
 }
 
+function hashText(text: string): string {
+    return createHash('sha1').update(text).digest('hex');
+}
+
+export interface RenderedSection {
+    key: string;
+    html: string;
+}
+
+/**
+ * Message posted to the webview: the full section order plus HTML for sections it does not have yet.
+ */
+export interface PreviewUpdate {
+    type: 'update';
+    order: string[];
+    sections: Record<string, string>;
+}
+
+/**
+ * Splits Markdown into heading-delimited sections, ignoring headings inside fenced code blocks.
+ */
+export function splitPreviewSections(markdown: string): string[] {
+    const sections: string[] = [];
+    let current: string[] = [];
+    let fence: string | undefined;
+
+    const flush = () => {
+        if (current.some(line => line.trim().length > 0)) {
+            sections.push(current.join('\n'));
+        }
+        current = [];
+    };
+
+    for (const line of markdown.split(/\r?\n/)) {
+        const fenceMatch = /^\s{0,3}(`{3,}|~{3,})/.exec(line);
+        if (fenceMatch) {
+            const marker = fenceMatch[1][0];
+            if (!fence) {
+                fence = marker;
+            } else if (marker === fence) {
+                fence = undefined;
+            }
+        } else if (!fence && /^#{1,6}\s/.test(line)) {
+            flush();
+        }
+        current.push(line);
+    }
+    flush();
+    return sections;
+}
+
+/**
+ * Computes the update for a webview that already holds the sections in `knownKeys`.
+ */
+export function diffPreviewSections(knownKeys: ReadonlySet<string>, sections: RenderedSection[]): PreviewUpdate {
+    const update: PreviewUpdate = { type: 'update', order: [], sections: {} };
+    for (const section of sections) {
+        update.order.push(section.key);
+        if (!knownKeys.has(section.key)) {
+            update.sections[section.key] = section.html;
+        }
+    }
+    return update;
+}
+
+/**
+ * Renders Markdown section by section, caching the HTML of each section by its content hash.
+ * Mermaid fences become placeholders tagged with the hash of their source so the webview can
+ * reuse diagrams it has already drawn.
+ */
+export class SectionRenderer {
+    private readonly _md: MarkdownIt;
+    private readonly _cache = new Map<string, string>();
+
+    constructor() {
+        this._md = new MarkdownIt();
+        const defaultFence = this._md.renderer.rules.fence;
+        this._md.renderer.rules.fence = (tokens, idx, options, env, self) => {
+            const token = tokens[idx];
+            if (token.info.trim() === 'mermaid') {
+                const source = token.content.trim();
+                return `<div class="mermaid" data-diagram="${hashText(source)}">${this._md.utils.escapeHtml(source)}</div>\n`;
+            }
+            return defaultFence ? defaultFence(tokens, idx, options, env, self) : self.renderToken(tokens, idx, options);
+        };
+    }
+
+    public get cacheSize(): number {
+        return this._cache.size;
+    }
+
+    public render(markdown: string): RenderedSection[] {
+        const occurrences = new Map<string, number>();
+        return splitPreviewSections(markdown).map(source => {
+            const hash = hashText(source);
+            const occurrence = occurrences.get(hash) ?? 0;
+            occurrences.set(hash, occurrence + 1);
+            return {
+                key: occurrence ? `${hash}:${occurrence}` : hash,
+                html: this._renderSection(hash, source),
+            };
+        });
+    }
+
+    private _renderSection(hash: string, source: string): string {
+        const cached = this._cache.get(hash);
+        if (cached !== undefined) {
+            // Refresh the entry so the eviction below drops the least recently used section.
+            this._cache.delete(hash);
+            this._cache.set(hash, cached);
+            return cached;
+        }
+        const html = this._md.render(source);
+        this._cache.set(hash, html);
+        if (this._cache.size > SECTION_CACHE_LIMIT) {
+            const oldest = this._cache.keys().next().value;
+            if (oldest !== undefined) {
+                this._cache.delete(oldest);
+            }
+        }
+        return html;
+    }
+}
+
 /**
  * Manages the webview panel for previewing architecture markdown with rendered Mermaid diagrams.
  */
@@ -20,16 +150,23 @@ export class ArchitecturePreview {
 
     private readonly _panel: vscode.WebviewPanel;
     private readonly _extensionUri: vscode.Uri;
+    private readonly _renderer = new SectionRenderer();
     private _disposables: vscode.Disposable[] = [];
     private _markdownContent: string;
+    private _sourceUri: vscode.Uri | undefined;
+    private _webviewKeys = new Set<string>();
+    private _webviewOrder: string[] = [];
+    private _webviewReady = false;
+    private _updateTimer: NodeJS.Timeout | undefined;
 
-    public static createOrShow(extensionUri: vscode.Uri, markdownContent: string) {
+    public static createOrShow(extensionUri: vscode.Uri, markdownContent: string, sourceUri?: vscode.Uri) {
         const column = vscode.window.activeTextEditor
             ? vscode.window.activeTextEditor.viewColumn
             : undefined;
 
         // If we already have a panel, show it and update its content.
         if (ArchitecturePreview.currentPanel) {
+            ArchitecturePreview.currentPanel._sourceUri = sourceUri;
             ArchitecturePreview.currentPanel._markdownContent = markdownContent;
             ArchitecturePreview.currentPanel._update();
             ArchitecturePreview.currentPanel._panel.reveal(column);
@@ -47,16 +184,67 @@ export class ArchitecturePreview {
             }
         );
 
-        ArchitecturePreview.currentPanel = new ArchitecturePreview(panel, extensionUri, markdownContent);
+        ArchitecturePreview.currentPanel = new ArchitecturePreview(panel, extensionUri, markdownContent, sourceUri);
+    }
+
+    /**
+     * Re-renders the open preview when the file it shows changed on disk and is not open in an editor
+     * (open documents are followed through their change events).
+     */
+    public static async refreshFromFile(uri: vscode.Uri): Promise<void> {
+        const preview = ArchitecturePreview.currentPanel;
+        if (!preview || preview._sourceUri?.toString() !== uri.toString()) {
+            return;
+        }
+        if (vscode.workspace.textDocuments.some(document => document.uri.toString() === uri.toString())) {
+            return;
+        }
+        try {
+            const content = await vscode.workspace.fs.readFile(uri);
+            preview._scheduleUpdate(Buffer.from(content).toString('utf8'));
+        } catch {
+            // The file is being replaced; the next change event will pick it up.
+        }
     }
 
-    private constructor(panel: vscode.WebviewPanel, extensionUri: vscode.Uri, markdownContent: string) {
+    private constructor(
+        panel: vscode.WebviewPanel,
+        extensionUri: vscode.Uri,
+        markdownContent: string,
+        sourceUri: vscode.Uri | undefined,
+    ) {
         this._panel = panel;
         this._extensionUri = extensionUri;
         this._markdownContent = markdownContent;
+        this._sourceUri = sourceUri;
 
-        // Set the webview's initial html content
-        this._update();
+        // The page is built once; content arrives as section diffs once its script reports ready.
+        this._panel.title = 'Architecture Preview';
+        this._panel.webview.html = this._getHtmlForWebview(this._panel.webview);
+
+        this._panel.webview.onDidReceiveMessage(
+            message => {
+                if (message?.type === 'ready') {
+                    // A (re)loaded webview starts empty, e.g. after the panel was hidden.
+                    this._webviewReady = true;
+                    this._webviewKeys = new Set();
+                    this._webviewOrder = [];
+                    this._update();
+                }
+            },
+            null,
+            this._disposables
+        );
+
+        vscode.workspace.onDidChangeTextDocument(
+            event => {
+                if (this._sourceUri && event.document.uri.toString() === this._sourceUri.toString()) {
+                    this._scheduleUpdate(event.document.getText());
+                }
+            },
+            null,
+            this._disposables
+        );
 
         // Listen for when the panel is disposed
         this._panel.onDidDispose(() => this.dispose(), null, this._disposables);
@@ -65,6 +253,11 @@ export class ArchitecturePreview {
     public dispose() {
         ArchitecturePreview.currentPanel = undefined;
 
+        if (this._updateTimer) {
+            clearTimeout(this._updateTimer);
+            this._updateTimer = undefined;
+        }
+
         // Clean up our resources
         this._panel.dispose();
 
@@ -76,24 +269,35 @@ export class ArchitecturePreview {
         }
     }
 
+    private _scheduleUpdate(markdownContent: string) {
+        this._markdownContent = markdownContent;
+        if (this._updateTimer) {
+            clearTimeout(this._updateTimer);
+        }
+        this._updateTimer = setTimeout(() => {
+            this._updateTimer = undefined;
+            this._update();
+        }, UPDATE_DEBOUNCE_MS);
+    }
+
     private _update() {
-        const webview = this._panel.webview;
-        this._panel.title = 'Architecture Preview';
-        this._panel.webview.html = this._getHtmlForWebview(webview, this._markdownContent);
+        if (!this._webviewReady) {
+            return;
+        }
+        const update = diffPreviewSections(this._webviewKeys, this._renderer.render(this._markdownContent));
+        const unchanged = Object.keys(update.sections).length === 0
+            && update.order.length === this._webviewOrder.length
+            && update.order.every((key, index) => key === this._webviewOrder[index]);
+        if (unchanged) {
+            return;
+        }
+        this._webviewKeys = new Set(update.order);
+        this._webviewOrder = update.order;
+        void this._panel.webview.postMessage(update);
     }
 
-    private _getHtmlForWebview(webview: vscode.Webview, markdownContent: string): string {
+    private _getHtmlForWebview(webview: vscode.Webview): string {
         const nonce = getNonce();
-        const md = new MarkdownIt();
-
-        // Simple replacement strategy:
-        // Find all mermaid blocks and wrap them in the required div.
-        // Let markdown-it render the rest.
-        const processedContent = markdownContent.replace(/```mermaid([\s\S]*?)```/g, (match, mermaidCode) => {
-            return `<div class="mermaid">${mermaidCode.trim()}</div>`;
-        });
-
-        const htmlContent = md.render(processedContent);
 
         return `<!DOCTYPE html>
             <html lang="en">
@@ -117,12 +321,85 @@ export class ArchitecturePreview {
                 </style>
             </head>
             <body>
-                ${htmlContent}
+                <div id="preview"></div>
                 <script nonce="${nonce}" src="https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.min.js"></script>
                 <script nonce="${nonce}">
-                    mermaid.initialize({ startOnLoad: true });
+                    const vscode = acquireVsCodeApi();
+                    const root = document.getElementById('preview');
+                    const sections = new Map();
+                    // Rendered SVG markup by diagram source hash, so unchanged diagrams are never redrawn.
+                    const diagrams = new Map();
+                    const DIAGRAM_CACHE_LIMIT = 128;
+                    let queue = Promise.resolve();
+
+                    mermaid.initialize({ startOnLoad: false });
+
+                    async function applyUpdate(update) {
+                        const pending = [];
+                        for (const [key, html] of Object.entries(update.sections)) {
+                            const element = document.createElement('section');
+                            element.innerHTML = html;
+                            sections.get(key)?.remove();
+                            sections.set(key, element);
+                            element.querySelectorAll('.mermaid[data-diagram]').forEach(diagram => {
+                                const svg = diagrams.get(diagram.dataset.diagram);
+                                if (svg !== undefined) {
+                                    diagram.innerHTML = svg;
+                                    diagram.setAttribute('data-processed', 'true');
+                                } else {
+                                    pending.push(diagram);
+                                }
+                            });
+                        }
+
+                        const keep = new Set(update.order);
+                        for (const [key, element] of sections) {
+                            if (!keep.has(key)) {
+                                element.remove();
+                                sections.delete(key);
+                            }
+                        }
+
+                        let previous = null;
+                        for (const key of update.order) {
+                            const element = sections.get(key);
+                            if (!element) {
+                                continue;
+                            }
+                            const expected = previous ? previous.nextSibling : root.firstChild;
+                            if (element !== expected) {
+                                root.insertBefore(element, expected);
+                            }
+                            previous = element;
+                        }
+
+                        if (pending.length > 0) {
+                            try {
+                                await mermaid.run({ nodes: pending });
+                            } catch (error) {
+                                console.error(error);
+                            }
+                            for (const diagram of pending) {
+                                if (diagram.querySelector('svg')) {
+                                    diagrams.set(diagram.dataset.diagram, diagram.innerHTML);
+                                    if (diagrams.size > DIAGRAM_CACHE_LIMIT) {
+                                        diagrams.delete(diagrams.keys().next().value);
+                                    }
+                                }
+                            }
+                        }
+                    }
+
+                    window.addEventListener('message', event => {
+                        const message = event.data;
+                        if (message && message.type === 'update') {
+                            queue = queue.then(() => applyUpdate(message));
+                        }
+                    });
+
+                    vscode.postMessage({ type: 'ready' });
                 </script>
             </body>
             </html>`;
     }
-}
\ No newline at end of file
+}
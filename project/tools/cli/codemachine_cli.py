@@ -11,15 +11,25 @@ the full pipeline end-to-end.
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
+import re
+import shutil
 import subprocess
 import sys
 import textwrap
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse, unquote
 
 try:
@@ -27,23 +37,134 @@ try:
 except ImportError:  # pragma: no cover - handled via mock mode
     completion = None  # type: ignore
 
+try:
+    from litellm import model_cost, token_counter  # type: ignore
+except ImportError:  # pragma: no cover - estimates fall back to heuristics
+    model_cost = {}  # type: ignore
+    token_counter = None  # type: ignore
+
+try:
+    from litellm import supports_function_calling, supports_response_schema  # type: ignore
+except ImportError:  # pragma: no cover - plan extraction falls back to plain text
+    supports_function_calling = None  # type: ignore
+    supports_response_schema = None  # type: ignore
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows uses msvcrt below
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:  # pragma: no cover - POSIX uses fcntl above
+    msvcrt = None  # type: ignore
+
 ARTIFACTS_DIR = ".artifacts"
 BUILD_DIR = "build"
 LOGS_DIR = "logs"
 LLM_LOG_SUBDIR = "llm"
+RUNS_LOG_SUBDIR = "runs"
+CONVERSATIONS_LOG_SUBDIR = "conversations"
+LOCKS_DIR = "locks"
 LINT_LOG_SUBDIR = "lints"
+TOUCHED_LOG_SUBDIR = "touched"
+METRICS_DIR = "metrics"
+CACHE_DIR = "cache"
+TASK_CACHE_FILE = "tasks.json"
+METRICS_STATE_FILE = "state.json"
+METRICS_TEXTFILE = "codemachine.prom"
+# Per-run log directories kept under logs/runs (override with CODEMACHINE_RUN_LOG_RETENTION).
+RUN_LOG_RETENTION = 50
+ARTIFACTS_GITIGNORE_ENTRIES = ["logs/", "lints/", "debug/", "metrics/", "locks/", "cache/"]
 
 REQUIREMENTS_FILE = "requirements.md"
 ARCHITECTURE_FILE = "architecture.md"
 PLAN_FILE = "plan.md"
 TODO_FILE = "todo.json"
+TODO_JSONL_FILE = "todo.jsonl"
+TODO_INDEX_FILE = "todo.jsonl.idx"
 BLUEPRINT_FILE = ".blueprint"
+STALE_FILE = "stale.json"
 CLI_LOG_FILE = "cli.log"
 
 CLI_DIR = Path(__file__).resolve().parent
 CLI_PROMPTS_DIR = CLI_DIR / "prompts"
 PROJECT_ROOT = CLI_DIR.parent.parent
 PROMPTS_DIR = PROJECT_ROOT / "prompts"
+TODO_SCHEMA_PATH = PROJECT_ROOT / "schemas" / "todo_schema.json"
+
+STAGE_ARTIFACTS = {
+    "requirements": REQUIREMENTS_FILE,
+    "architecture": ARCHITECTURE_FILE,
+    "plan": PLAN_FILE,
+}
+STAGE_ORDER = ["requirements", "architecture", "plan"]
+# Trailing spaces reserved on every plan record so status updates can be patched in place.
+PLAN_RECORD_SLACK = 16
+TASK_STATUSES = ["pending", "done", "failed"]
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+# Downstream documents cite upstream sections by anchor so a remade section can be traced.
+SECTION_REFERENCE_NOTE = (
+    "When content builds on a section of an earlier document, link that section by its heading "
+    "anchor, e.g. [Data Model](requirements.md#data-model)."
+)
+BUILDER_SYSTEM_PROMPT = (
+    "You are the Builder Agent. Produce a Markdown summary of the work performed, "
+    "validation steps, and follow-up items for the given task."
+)
+# Completion sizes and output speed assumed by `estimate` before any call has been recorded.
+DEFAULT_COMPLETION_TOKENS = {
+    "requirements": 1500,
+    "architecture": 2000,
+    "plan_markdown": 2000,
+    "plan_json": 1500,
+    "build_task": 600,
+}
+DEFAULT_OUTPUT_TOKENS_PER_SECOND = 40.0
+PLAN_TOOL_NAME = "record_plan_tasks"
+PLAN_REPAIR_ATTEMPTS = 2
+JSON_TYPES: Dict[str, Any] = {
+    "string": str,
+    "array": list,
+    "object": dict,
+    "boolean": bool,
+    "number": (int, float),
+    "integer": int,
+    "null": type(None),
+}
+# Upper bound on the prompt a feedback retry may resend before older turns are dropped.
+RETRY_TOKEN_BUDGET = 24000
+
+LLM_LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+DURATION_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+# name -> (type, help, histogram buckets)
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "codemachine_llm_requests": ("counter", "LLM calls by stage and model.", ()),
+    "codemachine_llm_request_duration_seconds": (
+        "histogram",
+        "Latency of LLM calls by stage and model.",
+        LLM_LATENCY_BUCKETS,
+    ),
+    "codemachine_llm_tokens": (
+        "counter",
+        "Tokens used by LLM calls by stage, model and kind (prompt, completion, cached).",
+        (),
+    ),
+    "codemachine_artifact_cache_requests": (
+        "counter",
+        "Artifact lookups by artifact and result; a hit reuses the existing file.",
+        (),
+    ),
+    "codemachine_artifact_writes": ("counter", "Files written by the CLI by kind.", ()),
+    "codemachine_qa_runs": ("counter", "QA script runs by check and result.", ()),
+    "codemachine_qa_duration_seconds": ("histogram", "Duration of QA script runs by check.", DURATION_BUCKETS),
+    "codemachine_task_duration_seconds": (
+        "histogram",
+        "Wall time of build tasks from generation through QA.",
+        DURATION_BUCKETS,
+    ),
+}
 
 
 def log(message: str) -> None:
@@ -88,6 +209,649 @@ def timestamp() -> str:
     return datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
 
 
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough token count (about four characters per token plus per-message overhead)."""
+    return sum(len(message.get("content", "")) // 4 + 4 for message in messages)
+
+
+def count_tokens(
+    model: str, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[int, str]:
+    """Count prompt tokens with the model's tokenizer when LiteLLM can provide it.
+
+    Tool definitions sent with the request are counted as their serialized JSON schema.
+    """
+    schema = json.dumps(tools) if tools else ""
+    if token_counter is not None:
+        try:
+            tokens = int(token_counter(model=model, messages=messages))
+            if schema:
+                tokens += int(token_counter(model=model, text=schema))
+            return tokens, "tokenizer"
+        except Exception:  # tokenizer unavailable offline or model unknown
+            pass
+    return estimate_tokens(messages) + len(schema) // 4, "heuristic"
+
+
+def token_prices(model: str) -> Optional[Tuple[float, float]]:
+    """USD per prompt and completion token, from the environment or LiteLLM's price table."""
+    input_cost = os.environ.get("CODEMACHINE_LLM_INPUT_COST")
+    output_cost = os.environ.get("CODEMACHINE_LLM_OUTPUT_COST")
+    if input_cost and output_cost:
+        return float(input_cost) / 1_000_000, float(output_cost) / 1_000_000
+    entry = model_cost.get(model) or model_cost.get(model.split("/", 1)[-1])
+    if entry and "input_cost_per_token" in entry:
+        return float(entry["input_cost_per_token"]), float(entry.get("output_cost_per_token", 0.0))
+    return None
+
+
+def content_digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def response_field(source: Any, name: str) -> Any:
+    """Read `name` from a LiteLLM response part, which may be a dict or an object."""
+    if source is None:
+        return None
+    return source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+
+
+def compile_schema(
+    schema: Dict[str, Any],
+    definitions: Dict[str, Any],
+    compiled: Optional[Dict[str, Callable[[Any, str], List[str]]]] = None,
+) -> Callable[[Any, str], List[str]]:
+    """Compile the JSON Schema subset used by schemas/ (type, enum, required, properties,
+    items and local $refs) into a checker returning error messages."""
+    compiled = {} if compiled is None else compiled
+    reference = schema.get("$ref")
+    if reference:
+        name = reference.rsplit("/", 1)[-1]
+
+        def check_reference(value: Any, path: str) -> List[str]:
+            if name not in compiled:
+                compiled[name] = compile_schema(definitions.get(name, {}), definitions, compiled)
+            return compiled[name](value, path)
+
+        return check_reference
+
+    expected = schema.get("type")
+    python_type = JSON_TYPES.get(expected) if expected else None
+    allowed = schema.get("enum")
+    required = schema.get("required", [])
+    properties = {
+        key: compile_schema(subschema, definitions, compiled) for key, subschema in schema.get("properties", {}).items()
+    }
+    items = compile_schema(schema["items"], definitions, compiled) if "items" in schema else None
+
+    def check(value: Any, path: str) -> List[str]:
+        if python_type is not None and (
+            not isinstance(value, python_type) or (expected in ("number", "integer") and isinstance(value, bool))
+        ):
+            return [f"{path}: expected {expected}"]
+        if allowed is not None and value not in allowed:
+            return [f"{path}: must be one of {', '.join(map(str, allowed))}"]
+        errors: List[str] = []
+        if isinstance(value, dict):
+            errors.extend(f"{path}: missing required field '{key}'" for key in required if key not in value)
+            for key, checker in properties.items():
+                if key in value:
+                    errors.extend(checker(value[key], f"{path}.{key}"))
+        if items is not None and isinstance(value, list):
+            for index, element in enumerate(value):
+                errors.extend(items(element, f"{path}[{index}]"))
+        return errors
+
+    return check
+
+
+@lru_cache(maxsize=None)
+def plan_item_validator() -> Tuple[Dict[str, Any], Callable[[Any, str], List[str]]]:
+    """Schema of one extracted task, derived from schemas/todo_schema.json, and its compiled checker.
+
+    The model returns a flat list of tasks, so an item is the schema's task (minus `status`, which
+    the CLI sets) plus the id and goal of the iteration it belongs to. Cached for the process.
+    """
+    try:
+        schema = json.loads(TODO_SCHEMA_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        schema = {}
+    definitions = schema.get("definitions", {})
+    task = definitions.get("task", {})
+    iteration_properties = definitions.get("iteration", {}).get("properties", {})
+    properties = {key: value for key, value in task.get("properties", {}).items() if key != "status"}
+    properties.setdefault("id", {"type": "string"})
+    properties.setdefault("description", {"type": "string"})
+    properties["iteration_id"] = iteration_properties.get("iteration_id", {"type": "string"})
+    properties["iteration_goal"] = {
+        "type": "string",
+        "description": iteration_properties.get("description", {}).get("description", "Goal of the iteration."),
+    }
+    required = [key for key in task.get("required", ["id", "description"]) if key != "status"]
+    item = {"type": "object", "properties": properties, "required": required + ["iteration_id"]}
+    return item, compile_schema(item, definitions)
+
+
+def new_run_id() -> str:
+    return f"{timestamp()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def atomic_write_text(target: Path, content: str) -> None:
+    """Write through a uniquely named temporary file so readers never see a partial file."""
+    temporary = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temporary.write_text(content, encoding="utf-8")
+    os.replace(temporary, target)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on `path` for the duration of the block.
+
+    Locks are taken per open file, so they serialize threads as well as processes.
+    Without fcntl or msvcrt the block runs unlocked.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover - Windows only
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:  # pragma: no cover - Windows only
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def run_in_background(name: str, function: Callable[..., Any], *args: Any) -> Future:
+    """Run `function` on a daemon thread and return a future for its result.
+
+    Unlike an executor's workers, the thread is not joined at exit, so an abandoned call
+    does not keep the process alive.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def task_identifier(task: Dict[str, Any]) -> str:
+    identifier = task.get("task_id") or task.get("id")
+    if not identifier:
+        # A shared placeholder id would make every id-less task overwrite the same record.
+        raise ValueError(f"Task has no id: {json.dumps(task)[:120]}")
+    return identifier
+
+
+@dataclass
+class MarkdownSection:
+    title: str
+    level: int
+    start: int
+    body_end: int
+    end: int
+
+
+def split_sections(markdown: str) -> Tuple[List[str], List[MarkdownSection]]:
+    """Split Markdown into lines and heading-delimited sections.
+
+    `end` covers nested subsections while `body_end` stops at the next heading of any level.
+    Headings inside fenced code blocks are ignored.
+    """
+    lines = markdown.splitlines(keepends=True)
+    headings: List[Tuple[int, int, str]] = []
+    fence: Optional[str] = None
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            if fence is None:
+                fence = stripped[:3]
+            elif stripped.startswith(fence):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        match = HEADING_PATTERN.match(line.rstrip("\r\n"))
+        if match:
+            headings.append((index, len(match.group(1)), match.group(2).strip()))
+
+    sections: List[MarkdownSection] = []
+    for position, (start, level, title) in enumerate(headings):
+        body_end = headings[position + 1][0] if position + 1 < len(headings) else len(lines)
+        end = len(lines)
+        for next_start, next_level, _ in headings[position + 1:]:
+            if next_level <= level:
+                end = next_start
+                break
+        sections.append(MarkdownSection(title, level, start, body_end, end))
+    return lines, sections
+
+
+def find_section(
+    sections: List[MarkdownSection], heading: str, index: Optional[int] = None
+) -> Optional[MarkdownSection]:
+    """Find the section titled `heading`; `index` (its position among all headings) tells duplicates apart."""
+    wanted = heading.strip().lstrip("#").strip().lower()
+    if index is not None:
+        if 0 <= index < len(sections) and sections[index].title.lower() == wanted:
+            return sections[index]
+        return None
+    matches = [section for section in sections if section.title.lower() == wanted]
+    if len(matches) > 1:
+        raise ValueError(f"Heading '{heading}' matches {len(matches)} sections; pass --index to pick one.")
+    return matches[0] if matches else None
+
+
+def heading_anchor(title: str) -> str:
+    """GitHub-style anchor of a heading: lower case, punctuation dropped, spaces as hyphens."""
+    return re.sub(r"[^\w\- ]", "", title.strip().lower()).replace(" ", "-")
+
+
+def references_section(text: str, title: str) -> bool:
+    """Whether `text` links the section titled `title` by its anchor, e.g. `requirements.md#data-model`."""
+    anchor = re.escape(heading_anchor(title))
+    return re.search(rf"#{anchor}(?![\w-])", text, re.IGNORECASE) is not None
+
+
+def mentions(text: str, phrase: str) -> bool:
+    # A trailing ".<word>" continues a dotted identifier, so "I1" is not mentioned by "I1.T2".
+    return re.search(rf"(?<!\w){re.escape(phrase)}(?!\.?\w)", text, re.IGNORECASE) is not None
+
+
+class MetricsRegistry:
+    """Counters and histograms accumulated across CLI runs in a Prometheus textfile.
+
+    Increments are buffered in memory and merged into the persisted state on `flush`,
+    so totals keep growing across runs the way a node exporter textfile expects. The
+    textfile uses the Prometheus text format the textfile collector parses; `render`
+    produces OpenMetrics for the HTTP endpoint.
+    """
+
+    def __init__(self, directory: Path, lock_path: Path) -> None:
+        self.state_path = directory / METRICS_STATE_FILE
+        self.textfile_path = directory / METRICS_TEXTFILE
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1.0) -> None:
+        key = self._labels_key(labels)
+        with self._lock:
+            series = self._pending.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        buckets = METRIC_DEFINITIONS[name][2]
+        key = self._labels_key(labels)
+        with self._lock:
+            series = self._pending.setdefault(name, {})
+            entry = series.setdefault(key, {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0})
+            self._add_observation(entry, buckets, value)
+
+    def flush(self) -> None:
+        with self._lock, file_lock(self.lock_path):
+            state = self._merged_state()
+            self._pending = {}
+            atomic_write_text(self.state_path, json.dumps(state, indent=2))
+            atomic_write_text(self.textfile_path, self._render(state))
+
+    def render(self) -> str:
+        with self._lock:
+            return self._render(self._merged_state(), openmetrics=True)
+
+    def series(self, name: str) -> List[Tuple[Dict[str, str], Any]]:
+        """Persisted and pending samples of `name` with their labels."""
+        with self._lock:
+            state = self._merged_state()
+        return [(dict(json.loads(key)), value) for key, value in state.get(name, {}).items()]
+
+    def _merged_state(self) -> Dict[str, Dict[str, Any]]:
+        state: Dict[str, Dict[str, Any]] = {}
+        if self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                state = {}
+        for name, series in self._pending.items():
+            target = state.setdefault(name, {})
+            for key, value in series.items():
+                if isinstance(value, dict):
+                    entry = target.setdefault(key, {"buckets": [0] * len(value["buckets"]), "sum": 0.0, "count": 0})
+                    entry["buckets"] = [a + b for a, b in zip(entry["buckets"], value["buckets"])]
+                    entry["sum"] += value["sum"]
+                    entry["count"] += value["count"]
+                else:
+                    target[key] = target.get(key, 0.0) + value
+        return state
+
+    @staticmethod
+    def _add_observation(entry: Dict[str, Any], buckets: Tuple[float, ...], value: float) -> None:
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                entry["buckets"][index] += 1
+                break
+        entry["sum"] += value
+        entry["count"] += 1
+
+    @staticmethod
+    def _labels_key(labels: Dict[str, str]) -> str:
+        return json.dumps(sorted(labels.items()))
+
+    @staticmethod
+    def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+        if not pairs:
+            return ""
+        escaped = [
+            f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for name, value in pairs
+        ]
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+    def _render(self, state: Dict[str, Dict[str, Any]], openmetrics: bool = False) -> str:
+        lines: List[str] = []
+        for name, (kind, help_text, buckets) in METRIC_DEFINITIONS.items():
+            series = state.get(name)
+            if not series:
+                continue
+            # OpenMetrics names the counter family without `_total`; the Prometheus text format
+            # types the sample name itself, or the textfile collector reads it as untyped.
+            family = f"{name}_total" if kind == "counter" and not openmetrics else name
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for key in sorted(series):
+                pairs = [(label, value) for label, value in json.loads(key)]
+                value = series[key]
+                if kind == "counter":
+                    lines.append(f"{name}_total{self._format_labels(pairs)} {self._format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, value["buckets"]):
+                    cumulative += count
+                    le = self._format_labels(pairs + [("le", self._format_value(bound))])
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(pairs + [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{self._format_labels(pairs)} {self._format_value(value['sum'])}")
+                lines.append(f"{name}_count{self._format_labels(pairs)} {value['count']}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int) -> ThreadingHTTPServer:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - silence request logs
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="codemachine-metrics", daemon=True).start()
+    log(f"Serving metrics at http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+
+class PlanStore:
+    """JSON-lines plan with one record per iteration or task and a sidecar offset index.
+
+    Records carry `kind` and `parent` fields so the nested todo.json tree can be rebuilt.
+    Updates are patched in place when the new record fits its padded line and appended
+    otherwise; a later record for the same key supersedes earlier ones.
+    """
+
+    def __init__(self, artifacts: Path, lock_path: Path) -> None:
+        self.path = artifacts / TODO_JSONL_FILE
+        self.index_path = artifacts / TODO_INDEX_FILE
+        self.lock_path = lock_path
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def write_plan(self, todo: List[Dict[str, Any]]) -> None:
+        with file_lock(self.lock_path):
+            self._write_plan(todo)
+
+    def read_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with file_lock(self.lock_path):
+            record = self._read_record(f"task:{task_id}")
+        if record is None:
+            return None
+        return {key: value for key, value in record.items() if key not in ("kind", "parent")}
+
+    def update_task(self, task_id: str, changes: Dict[str, Any]) -> None:
+        with file_lock(self.lock_path):
+            self._update_task(task_id, changes)
+
+    def export_todo(self) -> List[Dict[str, Any]]:
+        with file_lock(self.lock_path):
+            order, records, _ = self._scan()
+        nodes: Dict[str, Dict[str, Any]] = {}
+        roots: List[Dict[str, Any]] = []
+        for key in order:
+            record = dict(records[key])
+            kind = record.pop("kind", "task")
+            parent = record.pop("parent", None)
+            if kind == "iteration":
+                nodes[record.get("iteration_id", "Iter")] = record
+                if parent in nodes:
+                    nodes[parent].setdefault("iterations", []).append(record)
+                else:
+                    roots.append(record)
+            elif parent in nodes:
+                nodes[parent].setdefault("tasks", []).append(record)
+        return roots
+
+    def _write_plan(self, todo: List[Dict[str, Any]]) -> None:
+        records: Dict[str, List[int]] = {}
+        with self.path.open("wb") as handle:
+            for key, record in self._flatten(todo, None):
+                line = self._encode(record)
+                records[key] = [handle.tell(), len(line)]
+                handle.write(line)
+        self._write_index(records)
+
+    def _update_task(self, task_id: str, changes: Dict[str, Any]) -> None:
+        key = f"task:{task_id}"
+        record = self._read_record(key)
+        if record is None:
+            raise KeyError(f"Task {task_id} not found in {self.path.name}.")
+        record.update(changes)
+        records = self._load_index()
+        offset, length = records[key]
+        compact = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        if len(compact) + 1 <= length:
+            with self.path.open("r+b") as handle:
+                handle.seek(offset)
+                handle.write(compact + b" " * (length - len(compact) - 1) + b"\n")
+            return
+        line = self._encode(record)
+        offset = self.path.stat().st_size
+        with self.path.open("ab") as handle:
+            handle.write(line)
+        records[key] = [offset, len(line)]
+        self._write_index(records)
+
+    @classmethod
+    def _flatten(
+        cls, iterations: List[Dict[str, Any]], parent: Optional[str]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for iteration in iterations:
+            iteration_id = iteration.get("iteration_id", "Iter")
+            record = {key: value for key, value in iteration.items() if key not in ("tasks", "iterations")}
+            yield f"iteration:{iteration_id}", {"kind": "iteration", "parent": parent, **record}
+            for task in iteration.get("tasks", []):
+                yield f"task:{task_identifier(task)}", {"kind": "task", "parent": iteration_id, **task}
+            yield from cls._flatten(iteration.get("iterations", []), iteration_id)
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return (json.dumps(record, separators=(",", ":")) + " " * PLAN_RECORD_SLACK + "\n").encode("utf-8")
+
+    @staticmethod
+    def _record_key(record: Dict[str, Any]) -> str:
+        if record.get("kind") == "iteration":
+            return f"iteration:{record.get('iteration_id', 'Iter')}"
+        return f"task:{task_identifier(record)}"
+
+    def _read_record(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.exists():
+            return None
+        for attempt in range(2):
+            records = self._load_index(rebuild=attempt > 0)
+            entry = records.get(key)
+            if entry is None:
+                return None
+            with self.path.open("rb") as handle:
+                handle.seek(entry[0])
+                raw = handle.read(entry[1])
+            try:
+                record = json.loads(raw.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            if isinstance(record, dict) and self._record_key(record) == key:
+                return record
+        return None
+
+    def _scan(self) -> Tuple[List[str], Dict[str, Dict[str, Any]], Dict[str, List[int]]]:
+        order: List[str] = []
+        records: Dict[str, Dict[str, Any]] = {}
+        offsets: Dict[str, List[int]] = {}
+        offset = 0
+        with self.path.open("rb") as handle:
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line.decode("utf-8"))
+                    key = self._record_key(record)
+                    if key not in records:
+                        order.append(key)
+                    records[key] = record
+                    offsets[key] = [offset, len(line)]
+                offset += len(line)
+        return order, records, offsets
+
+    def _load_index(self, rebuild: bool = False) -> Dict[str, List[int]]:
+        if not rebuild and self.index_path.exists():
+            try:
+                index = json.loads(self.index_path.read_text(encoding="utf-8"))
+                if index.get("size") == self.path.stat().st_size:
+                    return index["records"]
+            except (json.JSONDecodeError, KeyError):
+                pass
+        # The index is missing or stale, so persist the rebuilt one.
+        offsets = self._scan()[2]
+        self._write_index(offsets)
+        return offsets
+
+    def _write_index(self, records: Dict[str, List[int]]) -> None:
+        payload = {"size": self.path.stat().st_size, "records": records}
+        atomic_write_text(self.index_path, json.dumps(payload))
+
+
+class TaskBuildCache:
+    """Build outputs and QA verdicts recorded against task fingerprints, keyed by task id."""
+
+    def __init__(self, path: Path, lock_path: Path) -> None:
+        self.path = path
+        self.lock_path = lock_path
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        with file_lock(self.lock_path):
+            return self._read()
+
+    def record(self, key: str, entry: Dict[str, Any]) -> None:
+        with file_lock(self.lock_path):
+            entries = self._read()
+            entries[key] = entry
+            atomic_write_text(self.path, json.dumps({"tasks": entries}, indent=2))
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            recorded = json.loads(self.path.read_text(encoding="utf-8"))["tasks"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return {}
+        # Older caches were keyed by output path; keep the newest entry per task.
+        entries: Dict[str, Dict[str, Any]] = {}
+        for key, entry in recorded.items():
+            task_id = entry.get("task_id", key)
+            if task_id not in entries or entry.get("built_at", "") >= entries[task_id].get("built_at", ""):
+                entries[task_id] = entry
+        return entries
+
+
+class LLMHistory:
+    """Per stage and model averages of past LLM calls, read back from the metrics state."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for labels, entry in registry.series("codemachine_llm_request_duration_seconds"):
+            stats = self._entry(labels)
+            stats["calls"] += entry["count"]
+            stats["seconds"] += entry["sum"]
+        for labels, value in registry.series("codemachine_llm_tokens"):
+            if labels.get("kind") in ("prompt", "completion"):
+                self._entry(labels)[labels["kind"]] += value
+
+    def project(self, stage: str, model: str) -> Tuple[int, float, str]:
+        """Return projected completion tokens, seconds and where the projection came from."""
+        exact = self.stats.get((stage, model))
+        if exact and exact["calls"]:
+            completion = exact["completion"] / exact["calls"] or DEFAULT_COMPLETION_TOKENS.get(stage, 1000)
+            return int(completion), exact["seconds"] / exact["calls"], "history"
+        completion = self._average_completion(stage)
+        model_stats = self._combine(entry for (_, name), entry in self.stats.items() if name == model)
+        if model_stats["completion"]:
+            return completion, completion * model_stats["seconds"] / model_stats["completion"], "model history"
+        return completion, completion / DEFAULT_OUTPUT_TOKENS_PER_SECOND, "default"
+
+    def _average_completion(self, stage: str) -> int:
+        stage_stats = self._combine(entry for (name, _), entry in self.stats.items() if name == stage)
+        if stage_stats["calls"] and stage_stats["completion"]:
+            return int(stage_stats["completion"] / stage_stats["calls"])
+        return DEFAULT_COMPLETION_TOKENS.get(stage, 1000)
+
+    def _entry(self, labels: Dict[str, str]) -> Dict[str, float]:
+        key = (labels.get("stage", ""), labels.get("model", ""))
+        return self.stats.setdefault(key, {"calls": 0.0, "seconds": 0.0, "prompt": 0.0, "completion": 0.0})
+
+    @staticmethod
+    def _combine(entries: Iterator[Dict[str, float]]) -> Dict[str, float]:
+        total = {"calls": 0.0, "seconds": 0.0, "prompt": 0.0, "completion": 0.0}
+        for entry in entries:
+            for key in total:
+                total[key] += entry[key]
+        return total
+
+
 @dataclass
 class WorkspaceContext:
     root: Path
@@ -97,10 +861,23 @@ class WorkspaceContext:
     def __post_init__(self) -> None:
         self.artifacts = ensure_dir(self.root / ARTIFACTS_DIR)
         self.logs_dir = ensure_dir(self.artifacts / LOGS_DIR)
-        self.llm_logs_dir = ensure_dir(self.logs_dir / LLM_LOG_SUBDIR)
+        self.locks_dir = ensure_dir(self.artifacts / LOCKS_DIR)
+        self.run_id = new_run_id()
+        self.run_logs_dir = ensure_dir(self.logs_dir / RUNS_LOG_SUBDIR / self.run_id)
+        self.llm_logs_dir = self.run_logs_dir / LLM_LOG_SUBDIR
+        self._llm_sequence = 0
+        self._llm_sequence_lock = threading.Lock()
         self.lint_logs_dir = ensure_dir(self.artifacts / LINT_LOG_SUBDIR)
+        self.touched_logs_dir = ensure_dir(self.logs_dir / TOUCHED_LOG_SUBDIR)
+        self.metrics = MetricsRegistry(ensure_dir(self.artifacts / METRICS_DIR), self.lock_path(METRICS_DIR))
+        self.plan_store = PlanStore(self.artifacts, self.lock_path(TODO_JSONL_FILE))
+        self.task_cache = TaskBuildCache(
+            ensure_dir(self.artifacts / CACHE_DIR) / TASK_CACHE_FILE, self.lock_path(TASK_CACHE_FILE)
+        )
         self.cli_log_path = self.logs_dir / CLI_LOG_FILE
         self.cli_log_path.touch(exist_ok=True)
+        self.run_log_path = self.run_logs_dir / CLI_LOG_FILE
+        self._prune_run_logs()
         self.blueprint_path = self.artifacts / BLUEPRINT_FILE
         if self.blueprint_path.exists():
             try:
@@ -113,25 +890,123 @@ class WorkspaceContext:
                 pass
         self._ensure_artifacts_gitignore()
 
+    @property
+    def uses_plan_store(self) -> bool:
+        return os.environ.get("CODEMACHINE_PLAN_FORMAT", "json").lower() == "jsonl" or self.plan_store.exists()
+
+    def lock_path(self, name: str) -> Path:
+        return self.locks_dir / f"{name.replace('/', '__')}.lock"
+
+    def lock(self, name: str) -> ContextManager[None]:
+        """Advisory lock shared by every CLI process working on this workspace."""
+        return file_lock(self.lock_path(name))
+
     def log(self, message: str) -> None:
         log(message)
-        with self.cli_log_path.open("a", encoding="utf-8") as handle:
-            handle.write(f"{timestamp()} {message}\n")
-
-    def record_llm(self, stage: str, messages: List[Dict[str, str]], response: str) -> None:
+        line = f"{timestamp()} {message}\n"
+        with self.run_log_path.open("a", encoding="utf-8") as handle:
+            handle.write(line)
+        with self.lock(CLI_LOG_FILE), self.cli_log_path.open("a", encoding="utf-8") as handle:
+            handle.write(f"{timestamp()} [{self.run_id}] {message}\n")
+
+    def record_llm(
+        self,
+        stage: str,
+        messages: List[Dict[str, str]],
+        response: str,
+        subject: Optional[str] = None,
+    ) -> None:
         payload = {
             "stage": stage,
+            "run_id": self.run_id,
+            "subject": subject,
             "messages": messages,
             "response": response,
             "timestamp": timestamp(),
         }
-        target = self.llm_logs_dir / f"{payload['timestamp']}_{stage}.json"
+        with self._llm_sequence_lock:
+            self._llm_sequence += 1
+            sequence = self._llm_sequence
+        target = ensure_dir(self.llm_logs_dir) / f"{sequence:04d}_{stage}.json"
         target.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        if subject:
+            pointer = {"transcript": target.relative_to(self.logs_dir).as_posix()}
+            atomic_write_text(self._conversation_pointer(stage, subject), json.dumps(pointer))
+
+    def load_conversation(self, stage: str, subject: str) -> Optional[Dict[str, Any]]:
+        """Return the latest recorded exchange for `subject` at `stage`, across runs."""
+        pointer = self._conversation_pointer(stage, subject)
+        if not pointer.exists():
+            return None
+        try:
+            transcript = self.logs_dir / json.loads(pointer.read_text(encoding="utf-8"))["transcript"]
+            payload = json.loads(transcript.read_text(encoding="utf-8"))
+        except (OSError, KeyError, json.JSONDecodeError):
+            return None
+        if not isinstance(payload.get("messages"), list) or not isinstance(payload.get("response"), str):
+            return None
+        return payload
+
+    def _prune_run_logs(self) -> None:
+        """Delete the oldest per-run log directories beyond the retention limit.
+
+        Runs holding the latest exchange of a conversation are kept so feedback can still
+        continue from them.
+        """
+        keep = int(os.environ.get("CODEMACHINE_RUN_LOG_RETENTION", RUN_LOG_RETENTION))
+        runs = sorted(path for path in self.run_logs_dir.parent.iterdir() if path.is_dir())
+        if len(runs) <= keep:
+            return
+        referenced: Set[str] = {self.run_id}
+        conversations = self.logs_dir / CONVERSATIONS_LOG_SUBDIR
+        if conversations.is_dir():
+            for pointer in conversations.glob("*.json"):
+                try:
+                    transcript = json.loads(pointer.read_text(encoding="utf-8"))["transcript"]
+                except (OSError, KeyError, TypeError, json.JSONDecodeError):
+                    continue
+                parts = Path(transcript).parts
+                if len(parts) > 1 and parts[0] == RUNS_LOG_SUBDIR:
+                    referenced.add(parts[1])
+        for path in runs[:max(len(runs) - keep, 0)]:
+            if path.name not in referenced:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _conversation_pointer(self, stage: str, subject: str) -> Path:
+        directory = ensure_dir(self.logs_dir / CONVERSATIONS_LOG_SUBDIR)
+        return directory / f"{stage}__{subject.replace('/', '_')}.json"
+
+    def record_touched(self, task_id: str, paths: List[Path], skipped: bool = False) -> Path:
+        """Write the workspace-relative paths a task produced so callers can stage only those.
+
+        `skipped` marks a task whose build was reused, so there is nothing to stage or commit.
+        """
+        relative: List[str] = []
+        root = self.root.resolve()
+        for path in paths:
+            try:
+                entry = path.resolve().relative_to(root).as_posix()
+            except ValueError:
+                continue
+            if entry not in relative:
+                relative.append(entry)
+        target = self.touched_logs_dir / f"{task_id}.json"
+        manifest: Dict[str, Any] = {"task_id": task_id, "paths": relative}
+        if skipped:
+            manifest["skipped"] = True
+        atomic_write_text(target, json.dumps(manifest, indent=2))
+        return target
 
-    def write_artifact(self, relative: str, content: str) -> Path:
+    def write_artifact(self, relative: str, content: str, lock_held: bool = False) -> Path:
+        """Replace an artifact; pass `lock_held` when the caller already holds its lock."""
         target = self.artifacts / relative
         target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
+        if lock_held:
+            atomic_write_text(target, content)
+        else:
+            with self.lock(relative):
+                atomic_write_text(target, content)
+        self.metrics.inc("codemachine_artifact_writes", {"kind": "document"})
         self.log(f"Wrote {relative}")
         return target
 
@@ -141,6 +1016,43 @@ class WorkspaceContext:
             return target.read_text(encoding="utf-8")
         return None
 
+    def mark_stale(self, artifact: str, keys: List[str], reason: str) -> None:
+        if not keys:
+            return
+        with self.lock(STALE_FILE):
+            stale = self._read_stale()
+            entries = stale.setdefault(artifact, {})
+            for key in keys:
+                entries[key] = reason
+            self._write_stale(stale)
+        self.log(f"Marked {len(keys)} part(s) of {artifact} stale: {', '.join(keys)}")
+
+    def clear_stale(self, artifact: str, keys: Optional[List[str]] = None) -> None:
+        with self.lock(STALE_FILE):
+            stale = self._read_stale()
+            if artifact not in stale:
+                return
+            if keys is None:
+                stale.pop(artifact)
+            else:
+                for key in keys:
+                    stale[artifact].pop(key, None)
+                if not stale[artifact]:
+                    stale.pop(artifact)
+            self._write_stale(stale)
+
+    def _read_stale(self) -> Dict[str, Dict[str, str]]:
+        content = self.read_artifact(STALE_FILE)
+        if not content:
+            return {}
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_stale(self, stale: Dict[str, Dict[str, str]]) -> None:
+        atomic_write_text(self.artifacts / STALE_FILE, json.dumps(stale, indent=2))
+
     def write_blueprint(self, force: bool) -> None:
         if self.blueprint_path.exists() and not force:
             return
@@ -155,21 +1067,25 @@ class WorkspaceContext:
             },
             "input_prompt": self.prompt,
         }
-        self.blueprint_path.write_text(json.dumps(blueprint, indent=2), encoding="utf-8")
+        with self.lock(BLUEPRINT_FILE):
+            atomic_write_text(self.blueprint_path, json.dumps(blueprint, indent=2))
         self.log(f"Blueprint updated at {self.blueprint_path}")
 
     def _ensure_artifacts_gitignore(self) -> None:
+        """Create .artifacts/.gitignore, or append the entries an older CLI version did not write."""
         gitignore_path = self.artifacts / '.gitignore'
-        if gitignore_path.exists():
+        if not gitignore_path.exists():
+            content = "\n".join(["# Auto-generated by Code Machine CLI", *ARTIFACTS_GITIGNORE_ENTRIES, ""])
+            gitignore_path.write_text(content, encoding='utf-8')
+            return
+        existing = gitignore_path.read_text(encoding='utf-8')
+        present = {line.strip() for line in existing.splitlines()}
+        missing = [entry for entry in ARTIFACTS_GITIGNORE_ENTRIES if entry not in present]
+        if not missing:
             return
-        content = "\n".join([
-            "# Auto-generated by Code Machine CLI",
-            "logs/",
-            "lints/",
-            "debug/",
-            "",
-        ])
-        gitignore_path.write_text(content, encoding='utf-8')
+        separator = "" if not existing or existing.endswith("\n") else "\n"
+        with gitignore_path.open("a", encoding='utf-8') as handle:
+            handle.write(separator + "\n".join(missing) + "\n")
 
 
 class LLMClient:
@@ -193,22 +1109,25 @@ class LLMClient:
     def draft_requirements(self, ctx: WorkspaceContext) -> str:
         if self.mode == "mock":
             return self._mock_requirements(ctx.project_name, ctx.prompt)
+        messages = self.requirements_messages(ctx)
+        response = self._invoke_llm(ctx, "requirements", messages)
+        ctx.record_llm("requirements", messages, response)
+        return response.strip() + "\n"
+
+    def requirements_messages(self, ctx: WorkspaceContext) -> List[Dict[str, str]]:
         template = load_template(
             "generate_initial_frd.txt",
             "Act as a senior analyst. Create a requirements doc based on the provided prompt: {input}",
         )
         document = ctx.prompt or "No prompt provided."
         user_content = template.replace("{input}", document)
-        messages = [
+        return [
             {
                 "role": "system",
                 "content": "You are Code Machine. Produce a structured Functional Requirements Document.",
             },
             {"role": "user", "content": user_content},
         ]
-        response = self._invoke_llm("requirements", messages)
-        ctx.record_llm("requirements", messages, response)
-        return response.strip() + "\n"
 
     def draft_architecture(self, ctx: WorkspaceContext, requirements: str) -> str:
         if self.mode == "mock":
@@ -237,19 +1156,25 @@ class LLMClient:
                 """
             ).strip() + "\n"
 
+        messages = self.architecture_messages(requirements)
+        response = self._invoke_llm(ctx, "architecture", messages)
+        ctx.record_llm("architecture", messages, response)
+        return response.strip() + "\n"
+
+    def architecture_messages(self, requirements: str) -> List[Dict[str, str]]:
         template = load_template(
             "plan_arch.txt",
             "You are a software architect. Given requirements, produce Markdown architecture with "
             "components, tech stack, and diagrams.",
         )
         prompt_body = template.replace("{manifest}", requirements).replace("{constraints}", "None provided.")
-        messages = [
-            {"role": "system", "content": "You are Code Machine. Produce a comprehensive architecture blueprint."},
+        return [
+            {
+                "role": "system",
+                "content": f"You are Code Machine. Produce a comprehensive architecture blueprint. {SECTION_REFERENCE_NOTE}",
+            },
             {"role": "user", "content": prompt_body},
         ]
-        response = self._invoke_llm("architecture", messages)
-        ctx.record_llm("architecture", messages, response)
-        return response.strip() + "\n"
 
     def draft_plan(self, ctx: WorkspaceContext, requirements: str, architecture: str) -> str:
         if self.mode == "mock":
@@ -266,6 +1191,12 @@ class LLMClient:
                 """
             ).strip() + "\n"
 
+        messages = self.plan_messages(requirements, architecture)
+        response = self._invoke_llm(ctx, "plan_markdown", messages)
+        ctx.record_llm("plan_markdown", messages, response)
+        return response.strip() + "\n"
+
+    def plan_messages(self, requirements: str, architecture: str) -> List[Dict[str, str]]:
         template = load_template(
             "plan_iter.txt",
             "You are a planning agent. Using the requirements and architecture, produce a multi-iteration plan in Markdown.",
@@ -279,13 +1210,10 @@ class LLMClient:
             {architecture}
             """
         )
-        messages = [
-            {"role": "system", "content": template},
+        return [
+            {"role": "system", "content": f"{template}\n\n{SECTION_REFERENCE_NOTE}"},
             {"role": "user", "content": plan_prompt},
         ]
-        response = self._invoke_llm("plan_markdown", messages)
-        ctx.record_llm("plan_markdown", messages, response)
-        return response.strip() + "\n"
 
     def extract_tasks(self, ctx: WorkspaceContext, plan_markdown: str) -> List[Dict[str, Any]]:
         if self.mode == "mock":
@@ -334,21 +1262,185 @@ class LLMClient:
                 },
             ]
 
+        messages = self.extract_messages(plan_markdown)
+        options = self.plan_output_options()
+        response = self._invoke_llm(ctx, "plan_json", messages, structured=options)
+        ctx.record_llm("plan_json", messages, response)
+        tasks = self._validated_plan_items(ctx, messages, response, options)
+        return self._tasks_to_iterations(tasks)
+
+    def _validated_plan_items(
+        self,
+        ctx: WorkspaceContext,
+        messages: List[Dict[str, str]],
+        response: str,
+        options: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """Validate extracted items and re-ask the model only for the invalid ones."""
+        items = [self._normalize_plan_item(item) for item in self._parse_task_array(response)]
+        attempts = int(os.environ.get("CODEMACHINE_PLAN_REPAIR_ATTEMPTS", PLAN_REPAIR_ATTEMPTS))
+        invalid = self._invalid_plan_items(items)
+        for attempt in range(1, attempts + 1):
+            if not invalid:
+                break
+            ctx.log(f"Plan extraction returned {len(invalid)} invalid task(s); requesting repairs ({attempt}/{attempts}).")
+            indexes = sorted(invalid)
+            repairs = self._repair_plan_items(ctx, messages, response, items, invalid, options)
+            for index, repaired in zip(indexes, repairs):
+                items[index] = self._normalize_plan_item(repaired)
+            invalid = self._invalid_plan_items(items)
+        if invalid:
+            details = "; ".join(error for index in sorted(invalid) for error in invalid[index][:2])
+            raise ValueError(f"Plan extraction produced {len(invalid)} invalid task(s): {details}")
+        return items
+
+    def _repair_plan_items(
+        self,
+        ctx: WorkspaceContext,
+        messages: List[Dict[str, str]],
+        response: str,
+        items: List[Any],
+        invalid: Dict[int, List[str]],
+        options: Dict[str, Any],
+    ) -> List[Any]:
+        lines = [
+            "Some of the tasks you returned are invalid. Return corrected versions of only the tasks below, "
+            'in the same order, as {"tasks": [...]}. Do not repeat any other task.'
+        ]
+        for index in sorted(invalid):
+            item = items[index]
+            lines.append(f"Task {index + 1}: {item if isinstance(item, str) else json.dumps(item)}")
+            lines.extend(f"  - {error}" for error in invalid[index])
+        repair_messages = messages + [
+            {"role": "assistant", "content": response},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+        # The extraction request and its answer are replayed unchanged on every attempt.
+        repaired = self._invoke_llm(
+            ctx, "plan_json_repair", repair_messages, cached_prefix=len(messages) + 1, structured=options
+        )
+        ctx.record_llm("plan_json_repair", repair_messages, repaired)
+        try:
+            return self._parse_task_array(repaired)
+        except ValueError:
+            return []
+
+    @staticmethod
+    def _invalid_plan_items(items: List[Any]) -> Dict[int, List[str]]:
+        checker = plan_item_validator()[1]
+        invalid: Dict[int, List[str]] = {}
+        seen: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            path = f"task {index + 1}"
+            if isinstance(item, str):
+                invalid[index] = [f"{path}: not valid JSON"]
+                continue
+            errors = checker(item, path)
+            identifier = item.get("id") if isinstance(item, dict) else None
+            if isinstance(identifier, str):
+                if identifier in seen:
+                    errors.append(f"{path}: duplicate id '{identifier}' (also task {seen[identifier] + 1})")
+                else:
+                    seen[identifier] = index
+            if errors:
+                invalid[index] = errors
+        return invalid
+
+    @staticmethod
+    def _normalize_plan_item(item: Any) -> Any:
+        """Map the legacy extraction keys onto the schema's names."""
+        if not isinstance(item, dict):
+            return item
+        normalized = dict(item)
+        if "id" not in normalized and "task_id" in normalized:
+            normalized["id"] = normalized.pop("task_id")
+        if "file_paths" not in normalized and "target_files" in normalized:
+            normalized["file_paths"] = normalized.pop("target_files")
+        for key in ("file_paths", "dependencies"):
+            if isinstance(normalized.get(key), str):
+                normalized[key] = [normalized[key]]
+        return normalized
+
+    def extract_messages(self, plan_markdown: str) -> List[Dict[str, str]]:
         template = load_template(
             "plan_iter_extraction.txt",
             "Extract tasks into JSON.",
         )
         user_content = template.replace("{plan_text}", plan_markdown)
-        messages = [
-            {"role": "system", "content": "You are Code Machine. Extract tasks according to the provided instructions."},
+        item_schema = plan_item_validator()[0]
+        system_prompt = (
+            "You are Code Machine. Extract tasks according to the provided instructions. "
+            'Return a JSON object {"tasks": [...]} with one item per task, each matching this JSON Schema: '
+            + json.dumps(item_schema)
+        )
+        return [
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content},
         ]
-        response = self._invoke_llm("plan_json", messages)
-        ctx.record_llm("plan_json", messages, response)
-        tasks = self._parse_task_array(response)
-        return self._tasks_to_iterations(tasks)
 
-    def build_task_summary(self, ctx: WorkspaceContext, task_id: str, feedback: Optional[str]) -> str:
+    def plan_output_options(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Completion arguments requesting structured plan output: a forced tool call when the
+        model supports function calling, else JSON mode when it supports structured responses,
+        else plain text (CODEMACHINE_PLAN_OUTPUT overrides)."""
+        model = model or self.model
+        mode = os.environ.get("CODEMACHINE_PLAN_OUTPUT", "auto").lower()
+        if mode == "auto":
+            try:
+                if supports_function_calling and supports_function_calling(model=model):
+                    mode = "tool"
+                elif supports_response_schema and supports_response_schema(model=model):
+                    mode = "json"
+                else:
+                    # Providers reject response_format they do not support; the validator still applies.
+                    mode = "text"
+            except Exception:  # unknown model
+                mode = "text"
+        if mode == "tool":
+            parameters = {
+                "type": "object",
+                "properties": {"tasks": {"type": "array", "items": plan_item_validator()[0]}},
+                "required": ["tasks"],
+            }
+            return {
+                "tools": [
+                    {
+                        "type": "function",
+                        "function": {
+                            "name": PLAN_TOOL_NAME,
+                            "description": "Record the tasks extracted from the iteration plan.",
+                            "parameters": parameters,
+                        },
+                    }
+                ],
+                "tool_choice": {"type": "function", "function": {"name": PLAN_TOOL_NAME}},
+            }
+        if mode == "json":
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    def build_task_summary(
+        self,
+        ctx: WorkspaceContext,
+        task_id: str,
+        feedback: Optional[str],
+        fresh: bool = False,
+    ) -> str:
+        summary, record = self.prepare_task_summary(ctx, task_id, feedback, fresh)
+        record()
+        return summary
+
+    def prepare_task_summary(
+        self,
+        ctx: WorkspaceContext,
+        task_id: str,
+        feedback: Optional[str],
+        fresh: bool = False,
+    ) -> Tuple[str, Callable[[], None]]:
+        """Generate a build summary without recording the exchange.
+
+        Returns the summary and a function that records the call's metrics, transcript and
+        conversation pointer, so speculative summaries leave no trace until they are used.
+        """
         if self.mode == "mock":
             feedback_text = feedback or "No reviewer feedback provided."
             return textwrap.dedent(
@@ -364,43 +1456,199 @@ class LLMClient:
                 ## Next Steps
                 - Review and commit changes.
                 """
-            ).strip() + "\n"
+            ).strip() + "\n", lambda: None
+
+        messages = None
+        if feedback and not fresh:
+            messages = self._continue_conversation(ctx, "build_task", task_id, BUILDER_SYSTEM_PROMPT, feedback)
+        cached_prefix = 0
+        if messages is None:
+            messages = self.build_task_messages(task_id, feedback)
+        else:
+            # Everything before the newest turn was sent verbatim by an earlier call.
+            cached_prefix = len(messages) - 1
+        pending: List[Callable[[], None]] = []
+        response = self._invoke_llm(ctx, "build_task", messages, cached_prefix=cached_prefix, deferred=pending)
+        pending.append(lambda: ctx.record_llm("build_task", messages, response, subject=task_id))
 
-        system_prompt = (
-            "You are the Builder Agent. Produce a Markdown summary of the work performed, "
-            "validation steps, and follow-up items for the given task."
-        )
+        def record() -> None:
+            for action in pending:
+                action()
+
+        return response.strip() + "\n", record
+
+    def build_task_messages(self, task_id: str, feedback: Optional[str] = None) -> List[Dict[str, str]]:
         user_lines = [f"Task ID: {task_id}"]
         if feedback:
             user_lines.append(f"Reviewer feedback: {feedback}")
-        messages = [
-            {"role": "system", "content": system_prompt},
+        return [
+            {"role": "system", "content": BUILDER_SYSTEM_PROMPT},
             {"role": "user", "content": "\n".join(user_lines)},
         ]
-        response = self._invoke_llm("build_task", messages)
-        ctx.record_llm("build_task", messages, response)
-        return response.strip() + "\n"
 
-    def _invoke_llm(self, stage: str, messages: List[Dict[str, str]]) -> str:
+    def _continue_conversation(
+        self,
+        ctx: WorkspaceContext,
+        stage: str,
+        subject: str,
+        system_prompt: str,
+        feedback: str,
+    ) -> Optional[List[Dict[str, str]]]:
+        """Extend the previous exchange for `subject` with the feedback as a new user turn.
+
+        Earlier turns are replayed unchanged so the provider can serve them from its prompt
+        cache. When the conversation outgrows the token budget the oldest reply/feedback pairs
+        are dropped; the system prompt, the original request and the latest reply are kept.
+        Returns None when there is nothing usable to continue from.
+        """
+        previous = ctx.load_conversation(stage, subject)
+        if previous is None:
+            return None
+        history = [
+            {"role": message.get("role", ""), "content": message.get("content", "")}
+            for message in previous["messages"]
+        ]
+        if len(history) < 2 or history[0] != {"role": "system", "content": system_prompt}:
+            ctx.log(f"Previous {stage} exchange for {subject} used a different prompt; starting fresh.")
+            return None
+        history.append({"role": "assistant", "content": previous["response"]})
+        turn = {"role": "user", "content": f"Reviewer feedback: {feedback}"}
+        budget = int(os.environ.get("CODEMACHINE_RETRY_TOKEN_BUDGET", RETRY_TOKEN_BUDGET))
+        while estimate_tokens(history + [turn]) > budget and len(history) > 3:
+            del history[2:4]
+        if estimate_tokens(history + [turn]) > budget:
+            ctx.log(f"Previous {stage} exchange for {subject} exceeds the retry budget; starting fresh.")
+            return None
+        ctx.log(f"Continuing {stage} conversation for {subject} ({len(history) + 1} messages).")
+        return history + [turn]
+
+    def regenerate_section(
+        self,
+        ctx: WorkspaceContext,
+        stage: str,
+        before: str,
+        section: str,
+        after: str,
+        feedback: Optional[str],
+    ) -> str:
+        if self.mode == "mock":
+            note = feedback or "No reviewer feedback provided."
+            return section.rstrip() + f"\n\n> Revised per feedback: {note}\n"
+
+        system_prompt = (
+            f"You are Code Machine. Revise a single section of the {stage} document. "
+            "Return only the revised section in Markdown, starting with its original heading line "
+            "at the same level. Keep it consistent with the surrounding sections, which must not change."
+        )
+        user_content = textwrap.dedent(
+            """
+            ## Document before the section
+            {before}
+
+            ## Section to revise
+            {section}
+
+            ## Document after the section
+            {after}
+
+            ## Reviewer feedback
+            {feedback}
+            """
+        ).format(
+            before=before.strip() or "(none)",
+            section=section.strip(),
+            after=after.strip() or "(none)",
+            feedback=feedback or "No reviewer feedback provided.",
+        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ]
+        stage_name = f"{stage}_section"
+        response = self._invoke_llm(ctx, stage_name, messages)
+        ctx.record_llm(stage_name, messages, response)
+        return self._strip_code_fence(response) + "\n"
+
+    def _invoke_llm(
+        self,
+        ctx: WorkspaceContext,
+        stage: str,
+        messages: List[Dict[str, str]],
+        cached_prefix: int = 0,
+        structured: Optional[Dict[str, Any]] = None,
+        deferred: Optional[List[Callable[[], None]]] = None,
+    ) -> str:
+        """Call the model; metrics are recorded right away, or appended to `deferred` when given."""
         if self.mode == "mock":
             raise RuntimeError("Mock mode should not call _invoke_llm directly.")
         if completion is None:
             raise RuntimeError("LiteLLM is not installed. Run `pip install litellm`.")
         kwargs: Dict[str, Any] = {
             "model": self.model,
-            "messages": messages,
+            "messages": self._mark_cached_prefix(messages, cached_prefix),
         }
         if self.api_key:
             kwargs["api_key"] = self.api_key
         if self.api_base:
             kwargs["api_base"] = self.api_base
+        if structured:
+            kwargs.update(structured)
         log(f"Calling LiteLLM for stage '{stage}' using model {self.model}")
+        labels = {"stage": stage, "model": self.model}
+        started = time.perf_counter()
         result = completion(**kwargs)
+        elapsed = time.perf_counter() - started
+
+        def record_metrics() -> None:
+            ctx.metrics.observe("codemachine_llm_request_duration_seconds", labels, elapsed)
+            ctx.metrics.inc("codemachine_llm_requests", labels)
+            self._record_usage(ctx, labels, result)
+
+        if deferred is None:
+            record_metrics()
+        else:
+            deferred.append(record_metrics)
         try:
-            return result["choices"][0]["message"]["content"]
+            message = result["choices"][0]["message"]
+            tool_calls = response_field(message, "tool_calls")
+            if tool_calls:
+                return response_field(response_field(tool_calls[0], "function"), "arguments")
+            return response_field(message, "content")
         except Exception as exc:  # pragma: no cover - defensive
             raise RuntimeError(f"Unexpected response from LiteLLM: {result}") from exc
 
+    def _mark_cached_prefix(self, messages: List[Dict[str, str]], cached_prefix: int) -> List[Dict[str, Any]]:
+        """Add an explicit cache breakpoint after the replayed turns for providers that need one.
+
+        OpenAI-style providers cache identical prompt prefixes automatically; Anthropic models
+        only cache up to a message carrying `cache_control`.
+        """
+        if cached_prefix <= 0 or "claude" not in self.model.lower():
+            return messages
+        marked: List[Dict[str, Any]] = [dict(message) for message in messages]
+        breakpoint_message = marked[cached_prefix - 1]
+        breakpoint_message["content"] = [
+            {"type": "text", "text": breakpoint_message["content"], "cache_control": {"type": "ephemeral"}}
+        ]
+        return marked
+
+    @staticmethod
+    def _record_usage(ctx: WorkspaceContext, labels: Dict[str, str], result: Any) -> None:
+        try:
+            usage = result["usage"]
+        except (KeyError, TypeError):
+            return
+        if usage is None:
+            return
+        for kind in ("prompt", "completion"):
+            value = response_field(usage, f"{kind}_tokens")
+            if value:
+                ctx.metrics.inc("codemachine_llm_tokens", {**labels, "kind": kind}, float(value))
+        details = response_field(usage, "prompt_tokens_details")
+        cached = response_field(details, "cached_tokens") or response_field(usage, "cache_read_input_tokens")
+        if cached:
+            ctx.metrics.inc("codemachine_llm_tokens", {**labels, "kind": "cached"}, float(cached))
+
     @staticmethod
     def _strip_code_fence(content: str) -> str:
         text = content.strip()
@@ -415,16 +1663,51 @@ class LLMClient:
             stripped = stripped[:closing_index]
         return stripped.strip()
 
-    def _parse_task_array(self, response: str) -> List[Dict[str, Any]]:
+    def _parse_task_array(self, response: str) -> List[Any]:
+        """Parse the extracted tasks, accepting a bare array or a {"tasks": [...]} object.
+
+        When the JSON is malformed, the array is decoded element by element and each element
+        that does not parse is kept as its raw text so it can be repaired on its own.
+        """
         cleaned = self._strip_code_fence(response)
         try:
             data = json.loads(cleaned)
         except json.JSONDecodeError as exc:
-            raise ValueError(f"Failed to parse plan JSON: {exc.msg}") from exc
+            items = self._salvage_task_array(cleaned)
+            if not items:
+                raise ValueError(f"Failed to parse plan JSON: {exc.msg}") from exc
+            return items
+        if isinstance(data, dict) and isinstance(data.get("tasks"), list):
+            return data["tasks"]
         if not isinstance(data, list):
             raise ValueError("Expected JSON array of tasks from plan extraction.")
         return data
 
+    @staticmethod
+    def _salvage_task_array(text: str) -> List[Any]:
+        start = text.find("[")
+        if start == -1:
+            return []
+        decoder = json.JSONDecoder()
+        items: List[Any] = []
+        position = start + 1
+        while position < len(text):
+            while position < len(text) and text[position] in " \t\r\n,":
+                position += 1
+            if position >= len(text) or text[position] == "]":
+                break
+            try:
+                value, position = decoder.raw_decode(text, position)
+                items.append(value)
+            except json.JSONDecodeError:
+                next_start = text.find("{", position + 1)
+                end = next_start if next_start != -1 else len(text)
+                items.append(text[position:end].strip().rstrip(",").strip())
+                if next_start == -1:
+                    break
+                position = next_start
+        return items
+
     def _tasks_to_iterations(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         nodes: Dict[str, Dict[str, Any]] = {}
         roots: List[Dict[str, Any]] = []
@@ -459,12 +1742,15 @@ class LLMClient:
             file_paths = task.get("target_files") or task.get("file_paths") or []
             if isinstance(file_paths, str):
                 file_paths = [file_paths]
-            node.setdefault("tasks", []).append({
+            entry = {
                 "id": task.get("task_id") or task.get("id") or "task",
                 "description": task.get("description", ""),
                 "status": "pending",
                 "file_paths": file_paths,
-            })
+            }
+            if task.get("dependencies"):
+                entry["dependencies"] = list(task["dependencies"])
+            node.setdefault("tasks", []).append(entry)
 
         def prune(node: Dict[str, Any]) -> Dict[str, Any]:
             node["iterations"] = [prune(child) for child in node.get("iterations", [])]
@@ -499,6 +1785,85 @@ class LLMClient:
         ).strip() + "\n"
 
 
+class IncrementalBuild:
+    """Per-run view of the task build cache: recorded entries plus the outputs built so far.
+
+    `forced` names why every task is rebuilt regardless of its fingerprint, if it is. A quiet
+    view makes the same decisions without logging them, for `estimate`.
+    """
+
+    def __init__(
+        self,
+        entries: Dict[str, Dict[str, Any]],
+        qa_enabled: bool,
+        forced: Optional[str],
+        explain: bool,
+        quiet: bool = False,
+    ) -> None:
+        self.entries = entries
+        self.qa_enabled = qa_enabled
+        self.forced = forced
+        self.explain = explain
+        self.quiet = quiet
+        self.outputs: Dict[str, Optional[str]] = {}
+        self.rebuilt_ids: Set[str] = set()
+
+    def output_of(self, task_id: str) -> Optional[str]:
+        """Output digest of `task_id` from this run, else from its recorded build."""
+        if task_id in self.outputs:
+            return self.outputs[task_id]
+        return self.entries.get(task_id, {}).get("output_sha")
+
+    def reuse(self, task_id: str, entry: Dict[str, Any]) -> None:
+        self.outputs[task_id] = entry.get("output_sha", "")
+
+    def rebuilt(self, task_id: str, entry: Dict[str, Any]) -> None:
+        self.outputs[task_id] = entry["output_sha"]
+        self.rebuilt_ids.add(task_id)
+
+    def rebuild_reasons(
+        self,
+        entry: Optional[Dict[str, Any]],
+        inputs: Dict[str, Any],
+        output: str,
+        artifacts: Path,
+    ) -> List[str]:
+        if self.forced:
+            return [self.forced]
+        if entry is None:
+            return ["no previous build"]
+        if entry.get("output") != output:
+            return [f"last build was written to {entry.get('output')}"]
+        reasons: List[str] = []
+        previous = entry.get("inputs", {})
+        for name in ("description", "file_paths", "feedback", "template"):
+            if previous.get(name) != inputs[name]:
+                reasons.append(f"{name.replace('_', ' ')} changed")
+        if previous.get("model") != inputs["model"]:
+            reasons.append(f"model changed ({previous.get('model')} -> {inputs['model']})")
+        previous_dependencies = previous.get("dependencies", {})
+        for dependency, dependency_output in inputs["dependencies"].items():
+            if dependency in self.rebuilt_ids:
+                reasons.append(f"dependency {dependency} was rebuilt")
+            elif dependency not in previous_dependencies:
+                reasons.append(f"dependency {dependency} added")
+            elif previous_dependencies[dependency] != dependency_output:
+                reasons.append(f"output of dependency {dependency} changed")
+        for dependency in previous_dependencies:
+            if dependency not in inputs["dependencies"]:
+                reasons.append(f"dependency {dependency} removed")
+        output_path = artifacts / output
+        if not output_path.is_file():
+            reasons.append("build output missing")
+        elif file_digest(output_path) != entry.get("output_sha"):
+            reasons.append("build output edited since it was recorded")
+        if entry.get("qa") == "failed":
+            reasons.append("QA failed on the recorded build")
+        elif self.qa_enabled and entry.get("qa") != "passed":
+            reasons.append("QA has not run on the recorded build")
+        return reasons
+
+
 class TypeAPipeline:
     def __init__(self, ctx: WorkspaceContext, llm: LLMClient) -> None:
         self.ctx = ctx
@@ -524,29 +1889,41 @@ class TypeAPipeline:
         existing = self.ctx.read_artifact(REQUIREMENTS_FILE)
         if existing and not force:
             self.ctx.log("requirements.md exists; reusing.")
+            self._record_cache(REQUIREMENTS_FILE, hit=True)
             return existing
+        self._record_cache(REQUIREMENTS_FILE, hit=False)
         doc = self.llm.draft_requirements(self.ctx)
         self.ctx.write_artifact(REQUIREMENTS_FILE, doc)
+        self.ctx.clear_stale(REQUIREMENTS_FILE)
         return doc
 
     def _ensure_architecture(self, requirements: str, force: bool) -> str:
         existing = self.ctx.read_artifact(ARCHITECTURE_FILE)
         if existing and not force:
             self.ctx.log("architecture.md exists; reusing.")
+            self._record_cache(ARCHITECTURE_FILE, hit=True)
             return existing
+        self._record_cache(ARCHITECTURE_FILE, hit=False)
         doc = self.llm.draft_architecture(self.ctx, requirements)
         self.ctx.write_artifact(ARCHITECTURE_FILE, doc)
+        self.ctx.clear_stale(ARCHITECTURE_FILE)
         return doc
 
     def _ensure_plan(self, requirements: str, architecture: str, force: bool) -> str:
         existing = self.ctx.read_artifact(PLAN_FILE)
         if existing and not force:
             self.ctx.log("plan.md exists; reusing.")
+            self._record_cache(PLAN_FILE, hit=True)
             return existing
+        self._record_cache(PLAN_FILE, hit=False)
         doc = self.llm.draft_plan(self.ctx, requirements, architecture)
         self.ctx.write_artifact(PLAN_FILE, doc)
+        self.ctx.clear_stale(PLAN_FILE)
         return doc
 
+    def _record_cache(self, artifact: str, hit: bool) -> None:
+        self.ctx.metrics.inc("codemachine_artifact_cache_requests", {"artifact": artifact, "result": "hit" if hit else "miss"})
+
     def extract_plan_to_json(self, force: bool) -> List[Dict[str, Any]]:
         plan = self.ctx.read_artifact(PLAN_FILE)
         if not plan:
@@ -555,46 +1932,525 @@ class TypeAPipeline:
 
     def extract_plan_to_json_from_content(self, plan_markdown: str, force: bool) -> List[Dict[str, Any]]:
         todo_path = self.ctx.artifacts / TODO_FILE
+        if not force and self.ctx.plan_store.exists():
+            self.ctx.log("todo.jsonl exists; reusing.")
+            self._record_cache(TODO_FILE, hit=True)
+            return self.ctx.plan_store.export_todo()
         if todo_path.exists() and not force:
             self.ctx.log("todo.json exists; reusing.")
+            self._record_cache(TODO_FILE, hit=True)
             return json.loads(todo_path.read_text(encoding="utf-8"))
+        self._record_cache(TODO_FILE, hit=False)
         todo = self.llm.extract_tasks(self.ctx, plan_markdown)
-        todo_path.write_text(json.dumps(todo, indent=2), encoding="utf-8")
+        with self.ctx.lock(TODO_FILE):
+            atomic_write_text(todo_path, json.dumps(todo, indent=2))
+        self.ctx.metrics.inc("codemachine_artifact_writes", {"kind": "document"})
         self.ctx.log("todo.json updated from plan.")
+        if self.ctx.uses_plan_store:
+            self.ctx.plan_store.write_plan(todo)
+            self.ctx.log("todo.jsonl updated from plan.")
+        self.ctx.clear_stale(TODO_FILE)
         return todo
 
-    def execute_iterations(self, todo: List[Dict[str, Any]], qa_enabled: bool) -> None:
+    def export_plan(self) -> None:
+        if not self.ctx.plan_store.exists():
+            raise FileNotFoundError("todo.jsonl not found; extract the plan with CODEMACHINE_PLAN_FORMAT=jsonl first.")
+        todo = self.ctx.plan_store.export_todo()
+        with self.ctx.lock(TODO_FILE):
+            atomic_write_text(self.ctx.artifacts / TODO_FILE, json.dumps(todo, indent=2))
+        self.ctx.log("todo.json exported from todo.jsonl.")
+
+    def set_task_status(self, task_id: str, status: str) -> None:
+        if self.ctx.plan_store.exists():
+            self.ctx.plan_store.update_task(task_id, {"status": status})
+        else:
+            todo_path = self.ctx.artifacts / TODO_FILE
+            if not todo_path.exists():
+                raise FileNotFoundError("todo.json not found; extract the plan before updating tasks.")
+            with self.ctx.lock(TODO_FILE):
+                todo = json.loads(todo_path.read_text(encoding="utf-8"))
+                task = self._find_task(todo, task_id)
+                if task is None:
+                    raise KeyError(f"Task {task_id} not found in todo.json.")
+                task["status"] = status
+                atomic_write_text(todo_path, json.dumps(todo, indent=2))
+        self.ctx.log(f"Task {task_id} marked {status}.")
+
+    def _lookup_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if self.ctx.plan_store.exists():
+            return self.ctx.plan_store.read_task(task_id)
+        todo_content = self.ctx.read_artifact(TODO_FILE)
+        if not todo_content:
+            return None
+        try:
+            return self._find_task(json.loads(todo_content), task_id)
+        except json.JSONDecodeError:
+            return None
+
+    def estimate(self, force: bool, model: Optional[str] = None, qa_enabled: bool = True) -> Dict[str, Any]:
+        """Project tokens, latency and cost of every call `project` would make, without calling a model.
+
+        Stages mirror `generate_until` (existing artifacts are reused unless `force`) followed by
+        the `execute_iterations` loop over the existing plan, skipping the tasks its build cache
+        would skip. A prompt that embeds a document which does not exist yet is padded with that
+        document's projected size.
+        """
+        model = model or self.llm.model
+        history = LLMHistory(self.ctx.metrics)
+        prices = token_prices(model)
+        rows: List[Dict[str, Any]] = []
+        notes: List[str] = []
+
+        def add(
+            stage: str,
+            subject: str,
+            messages: List[Dict[str, str]],
+            padding: int = 0,
+            tools: Optional[List[Dict[str, Any]]] = None,
+        ) -> int:
+            prompt_tokens, counter = count_tokens(model, messages, tools)
+            completion_tokens, seconds, source = history.project(stage, model)
+            cost = None
+            if prices is not None:
+                cost = (prompt_tokens + padding) * prices[0] + completion_tokens * prices[1]
+            rows.append(
+                {
+                    "stage": stage,
+                    "subject": subject,
+                    "prompt_tokens": prompt_tokens + padding,
+                    "completion_tokens": completion_tokens,
+                    "seconds": seconds,
+                    "cost": cost,
+                    "counter": counter if not padding else f"{counter}+projected",
+                    "projection": source,
+                }
+            )
+            return completion_tokens
+
+        documents = {name: self.ctx.read_artifact(name) for name in (REQUIREMENTS_FILE, ARCHITECTURE_FILE, PLAN_FILE)}
+        projected: Dict[str, int] = {}
+
+        def text(name: str) -> str:
+            return documents[name] or ""
+
+        def padding(*names: str) -> int:
+            return sum(projected.get(name, 0) for name in names if not documents[name])
+
+        if force or not documents[REQUIREMENTS_FILE]:
+            projected[REQUIREMENTS_FILE] = add("requirements", REQUIREMENTS_FILE, self.llm.requirements_messages(self.ctx))
+        if force or not documents[ARCHITECTURE_FILE]:
+            projected[ARCHITECTURE_FILE] = add(
+                "architecture",
+                ARCHITECTURE_FILE,
+                self.llm.architecture_messages(text(REQUIREMENTS_FILE)),
+                padding(REQUIREMENTS_FILE),
+            )
+        if force or not documents[PLAN_FILE]:
+            projected[PLAN_FILE] = add(
+                "plan_markdown",
+                PLAN_FILE,
+                self.llm.plan_messages(text(REQUIREMENTS_FILE), text(ARCHITECTURE_FILE)),
+                padding(REQUIREMENTS_FILE, ARCHITECTURE_FILE),
+            )
+
+        todo: Optional[List[Dict[str, Any]]] = None
+        if self.ctx.plan_store.exists():
+            todo = self.ctx.plan_store.export_todo()
+        elif (self.ctx.artifacts / TODO_FILE).exists():
+            todo = json.loads((self.ctx.artifacts / TODO_FILE).read_text(encoding="utf-8"))
+        if force or todo is None:
+            add(
+                "plan_json",
+                TODO_FILE,
+                self.llm.extract_messages(text(PLAN_FILE)),
+                padding(PLAN_FILE),
+                self.llm.plan_output_options(model).get("tools"),
+            )
+        if todo is None:
+            notes.append("todo.json does not exist yet; build tasks are not included.")
+        else:
+            if force:
+                notes.append("Build tasks are estimated from the current todo.json, which --force regenerates.")
+            builds = IncrementalBuild(
+                self.ctx.task_cache.load(), qa_enabled, "--force given" if force else None, False, quiet=True
+            )
+            skipped = 0
+            for iteration_id, task in self._plan_tasks(todo):
+                task_id = self._task_id(task)
+                output = self._build_output(iteration_id, task_id)
+                if self._decide_build(builds, output, task, None, model) is None:
+                    skipped += 1
+                    continue
+                # The new output is unknown, so tasks depending on this one are counted as rebuilt too.
+                builds.rebuilt(task_id, {"output_sha": None})
+                add("build_task", task_id, self.llm.build_task_messages(task_id))
+            if skipped:
+                notes.append(f"{skipped} task(s) are unchanged since their last build and would be skipped.")
+
+        if prices is None:
+            notes.append(
+                f"No prices known for {model}; set CODEMACHINE_LLM_INPUT_COST and CODEMACHINE_LLM_OUTPUT_COST "
+                "(USD per million tokens)."
+            )
+        totals = {
+            "calls": len(rows),
+            "prompt_tokens": sum(row["prompt_tokens"] for row in rows),
+            "completion_tokens": sum(row["completion_tokens"] for row in rows),
+            "seconds": sum(row["seconds"] for row in rows),
+            "cost": None if prices is None else sum(row["cost"] for row in rows),
+        }
+        return {"model": model, "rows": rows, "totals": totals, "notes": notes}
+
+    def remake_section(
+        self, stage: str, heading: str, feedback: Optional[str], index: Optional[int] = None
+    ) -> None:
+        artifact = STAGE_ARTIFACTS[stage]
+        # Hold the artifact's lock from read to write so a concurrent writer is never overwritten
+        # with a splice of the stale content.
+        with self.ctx.lock(artifact):
+            content = self.ctx.read_artifact(artifact)
+            if not content:
+                raise FileNotFoundError(f"{artifact} not found; generate it before remaking a section.")
+            lines, sections = split_sections(content)
+            section = find_section(sections, heading, index)
+            if not section:
+                where = "" if index is None else f" at heading index {index}"
+                raise ValueError(f"Section '{heading}' not found{where} in {artifact}.")
+
+            before = "".join(lines[:section.start])
+            original = "".join(lines[section.start:section.end])
+            after = "".join(lines[section.end:])
+            revised = self.llm.regenerate_section(self.ctx, stage, before, original, after, feedback)
+            first_line = revised.lstrip().splitlines()[0] if revised.strip() else ""
+            if not HEADING_PATTERN.match(first_line):
+                revised = lines[section.start] + revised.lstrip("\n")
+            revised = revised.rstrip("\n") + "\n"
+            if after and original.endswith("\n\n"):
+                revised += "\n"
+
+            self.ctx.write_artifact(artifact, before + revised + after, lock_held=True)
+        self.ctx.clear_stale(artifact, [section.title])
+        self.ctx.log(f"Regenerated section '{section.title}' of {artifact}.")
+        self._invalidate_downstream(stage, {section.title: original + revised})
+
+    def _invalidate_downstream(self, stage: str, changed: Dict[str, str]) -> None:
+        """Mark downstream sections stale when they link a changed section by its heading anchor.
+
+        Stale sections propagate further downstream, and plan changes mark the todo.json
+        tasks and iterations whose ids appear in the changed plan text.
+        """
+        source = STAGE_ARTIFACTS[stage]
+        for downstream in STAGE_ORDER[STAGE_ORDER.index(stage) + 1:]:
+            artifact = STAGE_ARTIFACTS[downstream]
+            content = self.ctx.read_artifact(artifact)
+            if not content or not changed:
+                return
+            lines, sections = split_sections(content)
+            referencing: Dict[str, str] = {}
+            reasons: Dict[str, str] = {}
+            for section in sections:
+                body = "".join(lines[section.start:section.body_end])
+                for title in changed:
+                    if references_section(body, title):
+                        referencing[section.title] = body
+                        reasons.setdefault(section.title, f"{source}#{heading_anchor(title)}")
+                        break
+            for title, reason in reasons.items():
+                self.ctx.mark_stale(artifact, [title], reason)
+            changed, source = referencing, artifact
+
+        todo_content = self.ctx.read_artifact(TODO_FILE)
+        if not todo_content or not changed:
+            return
+        try:
+            todo = json.loads(todo_content)
+        except json.JSONDecodeError:
+            return
+        text = "\n".join(changed.values())
+        identifiers = [identifier for identifier in self._plan_identifiers(todo) if mentions(text, identifier)]
+        self.ctx.mark_stale(TODO_FILE, identifiers, f"{PLAN_FILE} sections changed")
+
+    @classmethod
+    def _plan_identifiers(cls, iterations: List[Dict[str, Any]]) -> Iterator[str]:
+        for iteration in iterations:
+            if iteration.get("iteration_id"):
+                yield iteration["iteration_id"]
+            for task in iteration.get("tasks", []):
+                yield cls._task_id(task)
+            yield from cls._plan_identifiers(iteration.get("iterations", []))
+
+    def execute_iterations(
+        self,
+        todo: List[Dict[str, Any]],
+        qa_enabled: bool,
+        pipelined: bool = False,
+        qa_policy: str = "continue",
+        force: bool = False,
+        explain: bool = False,
+    ) -> None:
+        """Build every task whose inputs changed since its recorded build, plus its dependents."""
         build_dir = ensure_dir(self.ctx.artifacts / BUILD_DIR)
+        builds = IncrementalBuild(self.ctx.task_cache.load(), qa_enabled, "--force given" if force else None, explain)
+        if pipelined:
+            self._execute_pipelined(todo, build_dir, qa_enabled, qa_policy, builds)
+            return
+        current_iteration: Optional[str] = None
+        for iteration_id, task in self._plan_tasks(todo):
+            if iteration_id != current_iteration:
+                current_iteration = iteration_id
+                self.ctx.log(f"Starting iteration {iteration_id}")
+            task_id = self._task_id(task)
+            output = self._build_output(iteration_id, task_id)
+            build = self._decide_build(builds, output, task, None)
+            if build is None:
+                continue
+            started = time.perf_counter()
+            summary = self.llm.build_task_summary(self.ctx, task_id, None)
+            self._commit_task(build_dir, iteration_id, task, summary)
+            qa_passed = run_quality_checks(self.ctx, task_id) if qa_enabled else True
+            self._record_task_duration(started)
+            self._record_task_status(task_id, qa_passed)
+            self._record_build(builds, output, task_id, build, qa_passed if qa_enabled else None)
+            if not qa_passed and qa_policy == "stop":
+                self.ctx.log(f"Stopping build after QA failure in {task_id}.")
+                return
+
+    def _execute_pipelined(
+        self,
+        todo: List[Dict[str, Any]],
+        build_dir: Path,
+        qa_enabled: bool,
+        qa_policy: str,
+        builds: IncrementalBuild,
+    ) -> None:
+        """Run the build loop while generating the next task during the current task's QA.
+
+        Speculative summaries stay in memory, unrecorded, until their turn comes, so results
+        are committed in plan order and can simply be dropped when QA stops the build.
+        """
+        queue = list(self._plan_tasks(todo))
+        current_iteration: Optional[str] = None
+        decided: Dict[int, Optional[Dict[str, Any]]] = {}
+        prefetched: Optional[Tuple[int, Future]] = None
+        for index, (iteration_id, task) in enumerate(queue):
+            if iteration_id != current_iteration:
+                current_iteration = iteration_id
+                self.ctx.log(f"Starting iteration {iteration_id}")
+            task_id = self._task_id(task)
+            output = self._build_output(iteration_id, task_id)
+            if index in decided:
+                build = decided.pop(index)
+            else:
+                build = self._decide_build(builds, output, task, None)
+            if build is None:
+                continue
+            started = time.perf_counter()
+            if prefetched and prefetched[0] == index:
+                summary, record = prefetched[1].result()
+                record()
+            else:
+                summary = self.llm.build_task_summary(self.ctx, task_id, None)
+            prefetched = None
+            self._commit_task(build_dir, iteration_id, task, summary)
+
+            if index + 1 < len(queue):
+                next_iteration, next_task = queue[index + 1]
+                next_id = self._task_id(next_task)
+                if task_id in (next_task.get("dependencies") or []):
+                    self.ctx.log(f"Not prefetching {next_id}; it depends on {task_id}.")
+                else:
+                    # The next task does not depend on this one, so its inputs are already final.
+                    decided[index + 1] = self._decide_build(
+                        builds, self._build_output(next_iteration, next_id), next_task, None
+                    )
+                    if decided[index + 1] is not None:
+                        self.ctx.log(f"Prefetching {next_id} while {task_id} is finalized.")
+                        prefetched = (
+                            index + 1,
+                            run_in_background(
+                                "codemachine-prefetch", self.llm.prepare_task_summary, self.ctx, next_id, None
+                            ),
+                        )
+
+            qa_passed = run_quality_checks(self.ctx, task_id) if qa_enabled else True
+            self._record_task_duration(started)
+            self._record_task_status(task_id, qa_passed)
+            self._record_build(builds, output, task_id, build, qa_passed if qa_enabled else None)
+            if not qa_passed and qa_policy == "stop":
+                if prefetched:
+                    self.ctx.log(f"Discarding speculative output for {self._task_id(queue[prefetched[0]][1])}.")
+                self.ctx.log(f"Stopping build after QA failure in {task_id}.")
+                return
+
+    def _record_task_duration(self, started: float) -> None:
+        self.ctx.metrics.observe("codemachine_task_duration_seconds", {}, time.perf_counter() - started)
+        # Flush per task so long builds keep the exported textfile current.
+        self.ctx.metrics.flush()
+
+    @staticmethod
+    def _build_output(iteration_id: Optional[str], task_id: str) -> str:
+        if iteration_id is None:
+            return f"{BUILD_DIR}/{task_id}.md"
+        return f"{BUILD_DIR}/{iteration_id}/{task_id}.md"
+
+    def _task_inputs(
+        self,
+        builds: IncrementalBuild,
+        task: Dict[str, Any],
+        feedback: Optional[str],
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        task_id = self._task_id(task)
+        return {
+            "description": content_digest(task.get("description", "")),
+            "file_paths": content_digest(task.get("file_paths") or []),
+            "dependencies": {
+                dependency: builds.output_of(dependency) for dependency in task.get("dependencies") or []
+            },
+            "feedback": content_digest(feedback or ""),
+            "template": content_digest(self.llm.build_task_messages(task_id)),
+            "model": f"{self.llm.mode}:{model or self.llm.model}",
+        }
+
+    def _decide_build(
+        self,
+        builds: IncrementalBuild,
+        output: str,
+        task: Dict[str, Any],
+        feedback: Optional[str],
+        model: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the fingerprint to record when the task must be rebuilt, or None to reuse its build.
+
+        `model` overrides the configured model, for estimating a run with another one.
+        """
+        task_id = self._task_id(task)
+        inputs = self._task_inputs(builds, task, feedback, model)
+        fingerprint = content_digest(inputs)
+        entry = builds.entries.get(task_id)
+        reasons = builds.rebuild_reasons(entry, inputs, output, self.ctx.artifacts)
+        if not reasons:
+            builds.reuse(task_id, entry)
+            if builds.quiet:
+                return None
+            if builds.explain:
+                self.ctx.log(
+                    f"Skipping {task_id}: inputs match the build from run {entry.get('run_id')} "
+                    f"(fingerprint {fingerprint}, QA {entry.get('qa')})."
+                )
+            else:
+                self.ctx.log(f"Skipping {task_id}; unchanged since its last build.")
+            return None
+        if builds.explain and not builds.quiet:
+            self.ctx.log(f"Rebuilding {task_id}: {'; '.join(reasons)}.")
+        return {"fingerprint": fingerprint, "inputs": inputs}
+
+    def _record_build(
+        self,
+        builds: IncrementalBuild,
+        output: str,
+        task_id: str,
+        build: Dict[str, Any],
+        qa_passed: Optional[bool],
+    ) -> None:
+        output_sha = file_digest(self.ctx.artifacts / output)
+        entry = {
+            "task_id": task_id,
+            **build,
+            "output": output,
+            "output_sha": output_sha,
+            "qa": "skipped" if qa_passed is None else ("passed" if qa_passed else "failed"),
+            "run_id": self.ctx.run_id,
+            "built_at": timestamp(),
+        }
+        self.ctx.task_cache.record(task_id, entry)
+        builds.rebuilt(task_id, entry)
+
+    def _record_task_status(self, task_id: str, qa_passed: bool) -> None:
+        # Only the line-oriented store can afford a status write per task.
+        if self.ctx.plan_store.exists():
+            self.ctx.plan_store.update_task(task_id, {"status": "done" if qa_passed else "failed"})
+
+    @staticmethod
+    def _task_id(task: Dict[str, Any]) -> str:
+        return task_identifier(task)
+
+    @staticmethod
+    def _plan_tasks(todo: List[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
         for iteration in todo:
             iteration_id = iteration.get("iteration_id", "Iter")
-            self.ctx.log(f"Starting iteration {iteration_id}")
-            tasks = iteration.get("tasks", [])
-            for task in tasks:
-                task_id = task.get("task_id") or task.get("id") or "task"
-                summary = self.llm.build_task_summary(self.ctx, task_id, None)
-                target = build_dir / iteration_id
-                ensure_dir(target)
-                (target / f"{task_id}.md").write_text(summary, encoding="utf-8")
-                self.ctx.log(f"Completed task {task_id}")
-                for file_path in task.get("file_paths", []):
-                    absolute = self.ctx.root / file_path
-                    absolute.parent.mkdir(parents=True, exist_ok=True)
-                    if not absolute.exists():
-                        absolute.write_text(f"# Auto-generated placeholder for {task_id}\n", encoding="utf-8")
-                if qa_enabled:
-                    run_quality_checks(self.ctx, task_id)
-
-    def run_single_task(self, task_id: str, feedback: Optional[str], qa_enabled: bool) -> None:
+            for task in iteration.get("tasks", []):
+                yield iteration_id, task
+
+    @classmethod
+    def _find_task(cls, iterations: List[Dict[str, Any]], task_id: str) -> Optional[Dict[str, Any]]:
+        for iteration in iterations:
+            for task in iteration.get("tasks", []):
+                if cls._task_id(task) == task_id:
+                    return task
+            found = cls._find_task(iteration.get("iterations", []), task_id)
+            if found:
+                return found
+        return None
+
+    def _commit_task(self, build_dir: Path, iteration_id: str, task: Dict[str, Any], summary: str) -> None:
+        task_id = self._task_id(task)
+        target = ensure_dir(build_dir / iteration_id)
+        summary_path = target / f"{task_id}.md"
+        atomic_write_text(summary_path, summary)
+        self.ctx.metrics.inc("codemachine_artifact_writes", {"kind": "build_summary"})
+        self.ctx.log(f"Completed task {task_id}")
+        touched = [summary_path]
+        for file_path in task.get("file_paths", []):
+            absolute = self.ctx.root / file_path
+            absolute.parent.mkdir(parents=True, exist_ok=True)
+            if not absolute.exists():
+                absolute.write_text(f"# Auto-generated placeholder for {task_id}\n", encoding="utf-8")
+                self.ctx.metrics.inc("codemachine_artifact_writes", {"kind": "placeholder"})
+            touched.append(absolute)
+        self.ctx.record_touched(task_id, touched)
+
+    def run_single_task(
+        self,
+        task_id: str,
+        feedback: Optional[str],
+        qa_enabled: bool,
+        fresh: bool = False,
+        force: bool = False,
+        explain: bool = False,
+        incremental: bool = False,
+    ) -> None:
+        """Build one task; it is only skipped when `incremental` is set and its inputs are unchanged."""
         build_dir = ensure_dir(self.ctx.artifacts / BUILD_DIR)
-        summary = self.llm.build_task_summary(self.ctx, task_id, feedback)
+        task = self._lookup_task(task_id) or {"id": task_id}
+        output = self._build_output(None, task_id)
+        # --fresh asks for a new answer, so it never reuses the previous build.
+        forced = None
+        if force or fresh:
+            forced = "--force given" if force else "--fresh given"
+        elif not incremental:
+            forced = "task run explicitly"
+        builds = IncrementalBuild(self.ctx.task_cache.load(), qa_enabled, forced, explain)
+        build = self._decide_build(builds, output, task, feedback)
+        if build is None:
+            self.ctx.record_touched(task_id, [], skipped=True)
+            return
+        started = time.perf_counter()
+        summary = self.llm.build_task_summary(self.ctx, task_id, feedback, fresh=fresh)
         target = build_dir / f"{task_id}.md"
-        target.write_text(summary, encoding="utf-8")
+        atomic_write_text(target, summary)
+        self.ctx.metrics.inc("codemachine_artifact_writes", {"kind": "build_summary"})
         self.ctx.log(f"Generated build artifact for task {task_id}")
-        if qa_enabled:
-            run_quality_checks(self.ctx, task_id)
+        touched = [target]
+        touched.extend(self.ctx.root / file_path for file_path in task.get("file_paths", []))
+        self.ctx.record_touched(task_id, touched)
+        qa_passed = run_quality_checks(self.ctx, task_id) if qa_enabled else None
+        self._record_task_duration(started)
+        self._record_build(builds, output, task_id, build, qa_passed)
 
 
-def run_quality_checks(ctx: WorkspaceContext, label: str) -> None:
+def run_quality_checks(ctx: WorkspaceContext, label: str) -> bool:
+    passed = True
     scripts = [
         ("tools/lint.sh", "lint"),
         ("tools/test.sh", "test"),
@@ -604,18 +2460,23 @@ def run_quality_checks(ctx: WorkspaceContext, label: str) -> None:
         if not script_path.exists():
             continue
         ctx.log(f"Running {script} for {label}")
+        started = time.perf_counter()
         result = subprocess.run(
             ["/bin/bash", str(script_path)],
             cwd=ctx.root,
             capture_output=True,
             text=True,
         )
-        log_path = ctx.lint_logs_dir / f"{timestamp()}_{kind}_{label}.log"
+        ctx.metrics.observe("codemachine_qa_duration_seconds", {"check": kind}, time.perf_counter() - started)
+        ctx.metrics.inc("codemachine_qa_runs", {"check": kind, "result": "pass" if result.returncode == 0 else "fail"})
+        log_path = ctx.lint_logs_dir / f"{ctx.run_id}_{kind}_{label}.log"
         log_path.write_text(result.stdout + "\n" + result.stderr, encoding="utf-8")
         if result.returncode != 0:
+            passed = False
             ctx.log(f"{script} failed for {label} (see {log_path})")
         else:
             ctx.log(f"{script} passed for {label}")
+    return passed
 
 
 def command_generate(args: argparse.Namespace, llm: LLMClient) -> None:
@@ -626,7 +2487,10 @@ def command_generate(args: argparse.Namespace, llm: LLMClient) -> None:
         log("Failure requested via --fail.")
         print("Requested failure for test scenario.", file=sys.stderr)
         sys.exit(1)
-    pipeline.generate_until(args.until, force=args.force)
+    try:
+        pipeline.generate_until(args.until, force=args.force)
+    finally:
+        ctx.metrics.flush()
 
 
 def command_run(args: argparse.Namespace, llm: LLMClient) -> None:
@@ -639,7 +2503,18 @@ def command_run(args: argparse.Namespace, llm: LLMClient) -> None:
         log("Failure requested via --fail.")
         print("Requested failure for test scenario.", file=sys.stderr)
         sys.exit(1)
-    pipeline.run_single_task(args.task_id, args.feedback, qa_enabled=args.qa)
+    try:
+        pipeline.run_single_task(
+            args.task_id,
+            args.feedback,
+            qa_enabled=args.qa,
+            fresh=args.fresh,
+            force=args.force,
+            explain=args.explain,
+            incremental=args.incremental,
+        )
+    finally:
+        ctx.metrics.flush()
 
 
 def command_project(args: argparse.Namespace, llm: LLMClient) -> None:
@@ -649,21 +2524,95 @@ def command_project(args: argparse.Namespace, llm: LLMClient) -> None:
         raise ValueError("A prompt is required to run the project pipeline.")
 
     pipeline = TypeAPipeline(ctx, llm)
-    todo = pipeline.generate_until("todo", force=args.force) or []
-    if not args.auto_approve and sys.stdin.isatty():
-        ctx.log(f"Requirements stored at {ctx.artifacts / REQUIREMENTS_FILE}")
-        response = input("Continue to architecture/plan generation? [Y/n]: ").strip().lower()
-        if response not in {"", "y", "yes"}:
-            ctx.log("Stopping after requirements per user request.")
-            return
-    pipeline.execute_iterations(todo, qa_enabled=not args.no_qa)
+    server = start_metrics_server(ctx.metrics, args.metrics_port) if args.metrics_port is not None else None
+    try:
+        todo = pipeline.generate_until("todo", force=args.force) or []
+        if not args.auto_approve and sys.stdin.isatty():
+            ctx.log(f"Requirements stored at {ctx.artifacts / REQUIREMENTS_FILE}")
+            response = input("Continue to architecture/plan generation? [Y/n]: ").strip().lower()
+            if response not in {"", "y", "yes"}:
+                ctx.log("Stopping after requirements per user request.")
+                return
+        pipeline.execute_iterations(
+            todo,
+            qa_enabled=not args.no_qa,
+            pipelined=args.pipeline,
+            qa_policy=args.qa_policy,
+            force=args.force,
+            explain=args.explain,
+        )
+    finally:
+        ctx.metrics.flush()
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+def command_estimate(args: argparse.Namespace, llm: LLMClient) -> None:
+    workspace = parse_workspace_uri(args.workspace_uri, args.project_name or "workspace")
+    ctx = WorkspaceContext(workspace, args.project_name or workspace.name, args.prompt or "")
+    pipeline = TypeAPipeline(ctx, llm)
+    if args.fail:
+        log("Failure requested via --fail.")
+        print("Requested failure for test scenario.", file=sys.stderr)
+        sys.exit(1)
+    report = pipeline.estimate(force=args.force, model=args.model, qa_enabled=not args.no_qa)
+
+    def money(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"${value:.4f}"
+
+    ctx.log(f"Estimate for {report['model']} (no model calls made):")
+    for row in report["rows"]:
+        ctx.log(
+            f"  {row['stage']:<14} {row['subject']:<16} prompt {row['prompt_tokens']:>7} "
+            f"({row['counter']})  completion {row['completion_tokens']:>6}  "
+            f"{row['seconds']:>7.1f}s ({row['projection']})  {money(row['cost'])}"
+        )
+    totals = report["totals"]
+    ctx.log(
+        f"Total: {totals['calls']} calls, {totals['prompt_tokens']} prompt + {totals['completion_tokens']} "
+        f"completion tokens, ~{totals['seconds']:.0f}s sequential, {money(totals['cost'])}"
+    )
+    for note in report["notes"]:
+        ctx.log(f"Note: {note}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+def command_remake_section(args: argparse.Namespace, llm: LLMClient) -> None:
+    workspace = parse_workspace_uri(args.workspace_uri, args.project_name or "workspace")
+    ctx = WorkspaceContext(workspace, args.project_name or workspace.name, args.prompt or "")
+    pipeline = TypeAPipeline(ctx, llm)
+    if args.fail:
+        log("Failure requested via --fail.")
+        print("Requested failure for test scenario.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        pipeline.remake_section(args.stage, args.heading, args.feedback, args.index)
+    finally:
+        ctx.metrics.flush()
+
+
+def command_export_plan(args: argparse.Namespace, llm: LLMClient) -> None:
+    workspace = parse_workspace_uri(args.workspace_uri, args.project_name or "workspace")
+    ctx = WorkspaceContext(workspace, args.project_name or workspace.name, args.prompt or "")
+    TypeAPipeline(ctx, llm).export_plan()
+
+
+def command_set_task_status(args: argparse.Namespace, llm: LLMClient) -> None:
+    workspace = parse_workspace_uri(args.workspace_uri, args.project_name or "workspace")
+    ctx = WorkspaceContext(workspace, args.project_name or workspace.name, args.prompt or "")
+    TypeAPipeline(ctx, llm).set_task_status(args.task_id, args.status)
 
 
 def command_extract_plan(args: argparse.Namespace, llm: LLMClient) -> None:
     workspace = parse_workspace_uri(args.workspace_uri, args.project_name or "workspace")
     ctx = WorkspaceContext(workspace, args.project_name or workspace.name, args.prompt or "")
     pipeline = TypeAPipeline(ctx, llm)
-    pipeline.extract_plan_to_json(force=args.force)
+    try:
+        pipeline.extract_plan_to_json(force=args.force)
+    finally:
+        ctx.metrics.flush()
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -690,7 +2639,18 @@ def build_parser() -> argparse.ArgumentParser:
     run.add_argument("--prompt", help="Optional prompt override (for blueprint creation).")
     run.add_argument("--task-id", required=True)
     run.add_argument("--feedback")
+    run.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore the previous build exchange for this task when applying feedback.",
+    )
     run.add_argument("--qa", action="store_true", help="Run QA scripts after finishing the task.")
+    run.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip the task when its inputs are unchanged since its last build.",
+    )
+    run.add_argument("--explain", action="store_true", help="Explain why the task is rebuilt or skipped.")
 
     project = subparsers.add_parser("project", parents=[common], help="Execute the Type A pipeline end-to-end.")
     project.add_argument("-n", "--project-name", required=True)
@@ -698,11 +2658,69 @@ def build_parser() -> argparse.ArgumentParser:
     project.add_argument("--prompt", required=False, help="Free-form user prompt describing the project.")
     project.add_argument("--auto-approve", action="store_true", help="Skip interactive confirmation.")
     project.add_argument("--no-qa", action="store_true", help="Disable QA runs after each task.")
+    project.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Generate the next task while the current task's QA runs.",
+    )
+    project.add_argument(
+        "--qa-policy",
+        choices=["continue", "stop"],
+        default="continue",
+        help="Whether a failed QA run stops the build (defaults to continue).",
+    )
+    project.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve OpenMetrics on http://127.0.0.1:PORT/metrics while the pipeline runs (0 picks a free port).",
+    )
+    project.add_argument(
+        "--explain",
+        action="store_true",
+        help="Explain why each task is rebuilt or skipped.",
+    )
 
     extract = subparsers.add_parser("extract-plan", parents=[common], help="Convert plan.md to todo.json via LLM.")
     extract.add_argument("--project-name", help="Optional project name override.")
     extract.add_argument("--prompt", help="Optional prompt override for blueprint hydration.")
 
+    estimate = subparsers.add_parser(
+        "estimate",
+        parents=[common],
+        help="Project tokens, latency and cost of a project run without calling a model.",
+    )
+    estimate.add_argument("--project-name", help="Optional project name override.")
+    estimate.add_argument("--prompt", help="Prompt to estimate with (defaults to the blueprint prompt).")
+    estimate.add_argument("--model", help="Model to estimate for (defaults to CODEMACHINE_LLM_MODEL).")
+    estimate.add_argument("--output", help="Also write the estimate as JSON to this path.")
+    estimate.add_argument("--no-qa", action="store_true", help="Estimate a project run with QA disabled.")
+
+    remake = subparsers.add_parser(
+        "remake-section",
+        parents=[common],
+        help="Regenerate one Markdown section of requirements/architecture/plan.",
+    )
+    remake.add_argument("--project-name", help="Optional project name override.")
+    remake.add_argument("--prompt", help="Optional prompt override for blueprint hydration.")
+    remake.add_argument("--stage", choices=STAGE_ORDER, required=True)
+    remake.add_argument("--heading", required=True, help="Heading text of the section to regenerate.")
+    remake.add_argument(
+        "--index",
+        type=int,
+        help="Position of the heading among all headings (0-based), to tell duplicate headings apart.",
+    )
+    remake.add_argument("--feedback", help="Reviewer feedback for the section.")
+
+    export = subparsers.add_parser("export-plan", parents=[common], help="Regenerate todo.json from todo.jsonl.")
+    export.add_argument("--project-name", help="Optional project name override.")
+    export.add_argument("--prompt", help="Optional prompt override for blueprint hydration.")
+
+    status = subparsers.add_parser("set-task-status", parents=[common], help="Update the status of one task.")
+    status.add_argument("--project-name", help="Optional project name override.")
+    status.add_argument("--prompt", help="Optional prompt override for blueprint hydration.")
+    status.add_argument("--task-id", required=True)
+    status.add_argument("--status", choices=TASK_STATUSES, required=True)
+
     return parser
 
 
@@ -718,6 +2736,14 @@ def main(argv: Optional[List[str]] = None) -> None:
         command_project(args, llm)
     elif args.command == "extract-plan":
         command_extract_plan(args, llm)
+    elif args.command == "estimate":
+        command_estimate(args, llm)
+    elif args.command == "remake-section":
+        command_remake_section(args, llm)
+    elif args.command == "export-plan":
+        command_export_plan(args, llm)
+    elif args.command == "set-task-status":
+        command_set_task_status(args, llm)
     else:  # pragma: no cover
         parser.error(f"Unknown command {args.command}")
 